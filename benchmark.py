@@ -0,0 +1,429 @@
+# [2025-08-01] Sempre coloque os imports no topo do script.
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+import httpx
+import numpy as np
+import uvicorn
+from dotenv import load_dotenv
+
+# Mesmo comportamento do main.py: variáveis de ambiente antes dos roteadores
+load_dotenv()
+
+from routers import rag, state, graph, metrics, lexical  # noqa: E402
+
+# --- Benchmark de Carga (Stand-ins Locais) ---
+# Sobe o main:app num thread do uvicorn apontando para um Chroma e um SQLite
+# temporários, com um driver de grafo falso no lugar do Neo4j (ou o backend de
+# grafo embutido, ou o Neo4j real de NEO4J_URI, para comparar os dois) e
+# (opcionalmente) um encoder determinístico no lugar do e5-large. Dispara um mix de
+# rotas com concorrência configurável e salva p50/p95/p99 por rota em JSON.
+#
+# Uso:
+#   python benchmark.py --requests 2000 --concurrency 16
+#   python benchmark.py --model sentence-transformers/all-MiniLM-L6-v2
+#   python benchmark.py --graph-backend embedded
+#   python benchmark.py --graph-backend neo4j     (grava no Neo4j de NEO4J_URI: use um banco de teste)
+#   python benchmark.py --compare bench_results/a.json bench_results/b.json
+
+DEFAULT_MIX = "ingest=4,vector=4,graph=2,library=1"
+RESULTS_DIR = "./bench_results"
+FAKE_EMBEDDING_DIM = 384
+
+# --- Stand-ins ---
+
+class FakeEncoder:
+    """Encoder determinístico (hash de tokens) com a mesma interface do SentenceTransformer."""
+
+    def __init__(self, *args, **kwargs):
+        self.dim = FAKE_EMBEDDING_DIM
+
+    def _vector(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in text.lower().split():
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            vec[int.from_bytes(digest[:4], "little") % self.dim] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def encode(self, sentences, **kwargs):
+        if isinstance(sentences, str):
+            return self._vector(sentences)
+        return np.stack([self._vector(s) for s in sentences])
+
+class FakeResult(list):
+    def single(self):
+        return self[0] if self else None
+
+    def consume(self):
+        return None
+
+class FakeSession:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, *args, **kwargs):
+        return FakeResult()
+
+class FakeDriver:
+    """Driver Neo4j falso: aceita qualquer Cypher e não devolve registros."""
+
+    def session(self, **kwargs):
+        return FakeSession()
+
+    def execute_query(self, *args, **kwargs):
+        return [], None, []
+
+    def verify_connectivity(self):
+        return None
+
+    def close(self):
+        return None
+
+class FakeGraphDatabase:
+    @staticmethod
+    def driver(*args, **kwargs):
+        return FakeDriver()
+
+def install_stand_ins(workdir: str, model: str = None, graph_backend: str = "fake"):
+    """Redireciona os módulos para armazenamento temporário antes do lifespan rodar."""
+    # Telemetria do Chroma tenta rede a cada operação e polui a medição
+    os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+    rag.CHROMA_PATH = os.path.join(workdir, "chroma_db")
+    # Sem isso um active_index.json do CWD (de um reindex real) sobrepõe o --model
+    rag.ACTIVE_INDEX_PATH = os.path.join(workdir, "active_index.json")
+    state.SQLITE_PATH = os.path.join(workdir, "world_state.db")
+    lexical.LEXICAL_PATH = os.path.join(workdir, "lexical_index.db")
+    # fake: driver falso para tudo (Auth/Library/arestas); embedded: arestas no backend
+    # embutido e o resto no driver falso; neo4j: driver real em NEO4J_URI para tudo
+    if graph_backend == "neo4j":
+        if not graph.URI:
+            raise SystemExit("❌ --graph-backend neo4j requer NEO4J_URI (e NEO4J_USER/NEO4J_PASSWORD) no ambiente.")
+    else:
+        graph.GraphDatabase = FakeGraphDatabase
+    graph.GRAPH_BACKEND = "embedded" if graph_backend == "embedded" else "neo4j"
+    graph.GRAPH_EMBEDDED_PATH = os.path.join(workdir, "graph_store.db")
+    if model:
+        rag.MODEL_NAME = model
+    else:
+        rag.SentenceTransformer = FakeEncoder
+
+# --- Geração de Tráfego ---
+
+NAMES = ["Aldric", "Brynn", "Caelum", "Dara", "Eldon", "Fenwick", "Gwyn", "Hale", "Isolde", "Jorah"]
+PLACES = ["Taverna do Corvo", "Ruínas de Vel", "Porto Cinzento", "Floresta Negra", "Torre Arcana"]
+ITEMS = ["espada curta", "poção de cura", "mapa rasgado", "amuleto", "tocha", "corda"]
+WORDS = ("o grupo avança pela trilha enquanto a chuva cai sobre as pedras antigas e um som distante "
+         "ecoa entre as árvores revelando segredos esquecidos pelo tempo").split()
+
+class TrafficGenerator:
+    def __init__(self, seed: int, users: int, universes: int, vector_mode: str = "vector"):
+        self.rng = random.Random(seed)
+        self.vector_mode = vector_mode
+        self.adventures = [(f"bench-user-{u}", f"bench-universe-{w}") for u in range(users) for w in range(universes)]
+        self.turns = {adv: 0 for adv in self.adventures}
+
+    def _narrative(self) -> str:
+        # ~10% de turnos longos para exercitar o chunking do ingest
+        length = self.rng.randint(400, 900) if self.rng.random() < 0.1 else self.rng.randint(40, 160)
+        words = self.rng.choices(WORDS, k=length)
+        words.insert(self.rng.randrange(len(words)), self.rng.choice(NAMES))
+        words.insert(self.rng.randrange(len(words)), self.rng.choice(PLACES))
+        return " ".join(words)
+
+    def ingest(self) -> Dict[str, Any]:
+        user_id, universe_id = adv = self.rng.choice(self.adventures)
+        self.turns[adv] += 1
+        turn = self.turns[adv]
+        return {
+            "userId": user_id,
+            "universeId": universe_id,
+            "turnId": turn,
+            "timestamp": datetime.now().isoformat(),
+            "vectorData": {"text": self._narrative(), "type": "turn", "location": self.rng.choice(PLACES)},
+            "sqlData": {
+                "playerStatus": {"hp": self.rng.randint(1, 100), "mana": self.rng.randint(0, 50), "turn": turn},
+                "inventory": self.rng.sample(ITEMS, k=self.rng.randint(1, 4)),
+                "worldState": {"location": self.rng.choice(PLACES), "weather": "chuva", "day": turn // 10},
+            },
+            "graphData": [
+                {"subject": self.rng.choice(NAMES), "relation": "CONHECE", "object": self.rng.choice(NAMES)},
+                {"subject": self.rng.choice(NAMES), "relation": "ESTA_EM", "object": self.rng.choice(PLACES)},
+            ],
+        }
+
+    def vector(self) -> Dict[str, Any]:
+        user_id, universe_id = self.rng.choice(self.adventures)
+        query = f"{self.rng.choice(NAMES)} {self.rng.choice(PLACES)} {' '.join(self.rng.choices(WORDS, k=6))}"
+        return {"query": query, "universeId": universe_id, "userId": user_id, "n_results": 5, "mode": self.vector_mode}
+
+    def graph(self) -> Dict[str, Any]:
+        user_id, universe_id = self.rng.choice(self.adventures)
+        return {"entity": self.rng.choice(NAMES), "universeId": universe_id, "userId": user_id, "depth": 1}
+
+    def library(self):
+        user_id, universe_id = self.rng.choice(self.adventures)
+        if self.rng.random() < 0.7:
+            return "GET", f"/library/{user_id}", None
+        return "POST", "/library/universe", {
+            "id": universe_id, "userId": user_id, "name": f"Universo {universe_id}", "genre": "fantasia",
+        }
+
+    def next_request(self, route: str):
+        if route == "ingest":
+            return "POST", "/ingest/unified", self.ingest()
+        if route == "vector":
+            return "POST", "/query/vector", self.vector()
+        if route == "graph":
+            return "POST", "/query/graph", self.graph()
+        return self.library()
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("ingest", "vector", "graph", "library"):
+            raise ValueError(f"Rota desconhecida no mix: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+# --- Execução ---
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank
+    idx = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[idx]
+
+def summarize(samples: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> Dict[str, Any]:
+    routes = {}
+    for route, latencies in samples.items():
+        ordered = sorted(latencies)
+        routes[route] = {
+            "requests": len(ordered),
+            "errors": errors.get(route, 0),
+            "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+            "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        }
+    total = sum(len(v) for v in samples.values())
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "total_requests": total,
+        "total_errors": sum(errors.values()),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "routes": routes,
+    }
+
+async def drive(base_url: str, args, mix: Dict[str, float]) -> Dict[str, Any]:
+    generator = TrafficGenerator(args.seed, args.users, args.universes, args.vector_mode)
+    route_names = list(mix.keys())
+    weights = [mix[name] for name in route_names]
+    samples: Dict[str, List[float]] = {name: [] for name in route_names}
+    errors: Dict[str, int] = {}
+    remaining = {"count": 0}
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        async def worker(record: bool):
+            # O decremento não tem await no meio: seguro no loop de eventos
+            while remaining["count"] > 0:
+                remaining["count"] -= 1
+
+                route = generator.rng.choices(route_names, weights)[0]
+                method, path, body = generator.next_request(route)
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    failed = response.status_code >= 400 or (
+                        route == "ingest" and response.json().get("status") != "success"
+                    )
+                except httpx.HTTPError:
+                    failed = True
+                elapsed = time.perf_counter() - start
+
+                if record:
+                    samples[route].append(elapsed)
+                    if failed:
+                        errors[route] = errors.get(route, 0) + 1
+
+        # Aquecimento (conexões, caches do Chroma) não entra no relatório
+        remaining["count"] = args.warmup
+        await asyncio.gather(*(worker(False) for _ in range(args.concurrency)))
+
+        remaining["count"] = args.requests
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(True) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return summarize(samples, errors, elapsed)
+
+def stage_breakdown() -> Dict[str, Any]:
+    """Tempo médio por etapa interna (encode, chroma, sqlite...) medido pelo módulo metrics."""
+    stages = {}
+    for labels, (count, total) in metrics.snapshot(metrics.STAGE_METRIC).items():
+        stage = dict(labels).get("stage", "?")
+        stages[stage] = {"count": count, "mean_ms": round(total / count * 1000, 3) if count else 0.0}
+    return stages
+
+def git_revision() -> str:
+    try:
+        repo_dir = os.path.dirname(os.path.abspath(__file__))
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=repo_dir, text=True).strip()
+    except Exception:
+        return "unknown"
+
+def run_benchmark(args) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    workdir = tempfile.mkdtemp(prefix="cronos_bench_")
+    install_stand_ins(workdir, args.model, args.graph_backend)
+
+    # Importa o app só depois dos stand-ins (o lifespan lê as globais dos módulos)
+    from main import app
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    # Espera o lifespan terminar (carregar o modelo pode levar alguns segundos)
+    deadline = time.time() + args.startup_timeout
+    while not server.started:
+        if not thread.is_alive() or time.time() > deadline:
+            raise RuntimeError("Servidor de benchmark não iniciou.")
+        time.sleep(0.1)
+
+    # Com o Neo4j real, um banco fora do ar mediria só erros: aborta antes
+    if args.graph_backend == "neo4j":
+        try:
+            graph.driver.verify_connectivity()
+        except Exception as e:
+            server.should_exit = True
+            thread.join()
+            raise RuntimeError(f"Neo4j inacessível em '{graph.URI}': {e}")
+
+    print(f"🏁 [BENCH] Servidor pronto em {workdir}. Disparando {args.requests} requisições "
+          f"(concorrência {args.concurrency}, mix {args.mix})...")
+    try:
+        summary = asyncio.run(drive(f"http://127.0.0.1:{args.port}", args, mix))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "config": {
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "mix": mix,
+            "users": args.users,
+            "universes": args.universes,
+            "seed": args.seed,
+            "model": args.model or "fake-hash-encoder",
+            "graph_backend": args.graph_backend,
+            "vector_mode": args.vector_mode,
+        },
+        "summary": summary,
+        "stages": stage_breakdown(),
+    }
+
+# --- Relatórios ---
+
+def print_report(result: Dict[str, Any]):
+    summary = result["summary"]
+    config = result["config"]
+    print(f"\n--- 📈 Benchmark ({result['revision']}, {config['model']}, grafo {config.get('graph_backend', 'fake')}) ---")
+    print(f"Total: {summary['total_requests']} req em {summary['elapsed_s']}s "
+          f"-> {summary['throughput_rps']} req/s | erros: {summary['total_errors']}")
+    print(f"{'rota':<10}{'req':>7}{'err':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, stats in summary["routes"].items():
+        print(f"{route:<10}{stats['requests']:>7}{stats['errors']:>6}{stats['throughput_rps']:>10}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+    if result.get("stages"):
+        print("\nEtapas internas (média):")
+        for stage, stats in sorted(result["stages"].items()):
+            print(f"  {stage:<28}{stats['count']:>7}x {stats['mean_ms']:>10} ms")
+
+def compare(base_path: str, new_path: str):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def delta(old, cur):
+        return f"{((cur - old) / old * 100):+.1f}%" if old else "n/a"
+
+    b, n = base["summary"], new["summary"]
+    print(f"\n--- ⚖️  {base.get('revision')} -> {new.get('revision')} ---")
+    print(f"Throughput: {b['throughput_rps']} -> {n['throughput_rps']} req/s ({delta(b['throughput_rps'], n['throughput_rps'])})")
+    for route in sorted(set(b["routes"]) | set(n["routes"])):
+        old, cur = b["routes"].get(route), n["routes"].get(route)
+        if not old or not cur:
+            print(f"  {route}: presente em apenas uma das execuções")
+            continue
+        cols = " | ".join(
+            f"{key} {old[key]} -> {cur[key]} ({delta(old[key], cur[key])})" for key in ("p50_ms", "p95_ms", "p99_ms")
+        )
+        print(f"  {route:<8} {cols}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga do Cronos com stand-ins locais.")
+    parser.add_argument("--requests", type=int, default=1000, help="Requisições medidas")
+    parser.add_argument("--warmup", type=int, default=50, help="Requisições de aquecimento (descartadas)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Pesos por rota: ingest=4,vector=4,graph=2,library=1")
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--universes", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--model", default=None, help="Modelo real pequeno (ex.: sentence-transformers/all-MiniLM-L6-v2); padrão: encoder falso")
+    parser.add_argument("--graph-backend", choices=("fake", "embedded", "neo4j"), default="fake",
+                        help="fake: driver Neo4j sem efeito | embedded: backend de grafo em processo | "
+                             "neo4j: Neo4j real de NEO4J_URI (grava dados de teste nele)")
+    parser.add_argument("--vector-mode", choices=("vector", "hybrid"), default="vector")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: bench_results/<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NOVO"), help="Compara dois resultados salvos")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    # O log INFO por requisição do httpx distorce a medição
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    result = run_benchmark(args)
+    print_report(result)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 [BENCH] Resultado salvo em {output}")
+
+if __name__ == "__main__":
+    sys.exit(main())
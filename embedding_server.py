@@ -0,0 +1,141 @@
+# [2025-08-01] Sempre coloque os imports no topo do script.
+import os
+import queue
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from typing import List
+
+import numpy as np
+
+# --- Servidor de Embeddings Compartilhado ---
+# No modo produção (python main.py --workers N) cada worker do uvicorn carregaria
+# sua própria cópia do e5-large. Em vez disso, um único processo carrega o modelo
+# e atende todos os workers por um socket Unix, juntando em um só batch os textos
+# que chegam de workers diferentes dentro de uma janela curta.
+
+SOCKET_ENV = "EMBEDDING_SERVER_SOCKET"
+AUTHKEY_ENV = "EMBEDDING_SERVER_AUTHKEY"
+
+MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "64"))
+BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+
+class _Pending:
+    __slots__ = ("texts", "result", "done")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.result = None
+        self.done = threading.Event()
+
+def _batch_loop(model, requests: "queue.Queue[_Pending]"):
+    """Junta pedidos de várias conexões e faz um único encode por janela."""
+    while True:
+        batch = [requests.get()]
+        total = len(batch[0].texts)
+        deadline = time.perf_counter() + BATCH_WAIT_MS / 1000
+        while total < MAX_BATCH:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            total += len(item.texts)
+
+        texts = [text for item in batch for text in item.texts]
+        try:
+            embeddings = np.asarray(model.encode(texts, batch_size=MAX_BATCH), dtype=np.float32)
+            offset = 0
+            for item in batch:
+                item.result = embeddings[offset:offset + len(item.texts)]
+                offset += len(item.texts)
+        except Exception as e:
+            print(f"❌ [EMBED] Erro no encode em lote: {e}")
+            for item in batch:
+                item.result = {"error": str(e)}
+
+        for item in batch:
+            item.done.set()
+
+def _handle_connection(conn, requests: "queue.Queue[_Pending]"):
+    try:
+        while True:
+            texts = conn.recv()
+            pending = _Pending(texts)
+            requests.put(pending)
+            pending.done.wait()
+            conn.send(pending.result)
+    except (EOFError, OSError):
+        pass
+    finally:
+        conn.close()
+
+def serve(socket_path: str, authkey: bytes, model_name: str, ready=None):
+    """Ponto de entrada do processo servidor (multiprocessing.Process)."""
+    # Import local: só o processo servidor paga o custo do torch + modelo
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    print(f"🧠 [EMBED] Carregando '{model_name}' ({device.upper()}) para todos os workers...")
+    model = SentenceTransformer(model_name, device=device)
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    requests: "queue.Queue[_Pending]" = queue.Queue()
+    threading.Thread(target=_batch_loop, args=(model, requests), daemon=True).start()
+
+    with Listener(socket_path, family="AF_UNIX", authkey=authkey) as listener:
+        print(f"✅ [EMBED] Servidor de embeddings ouvindo em {socket_path} (batch máx. {MAX_BATCH}).")
+        if ready is not None:
+            ready.set()
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=_handle_connection, args=(conn, requests), daemon=True).start()
+
+# --- Cliente (usado pelo rag.py nos workers) ---
+
+class RemoteEncoder:
+    """Mesma interface de encode() do SentenceTransformer, mas delegando ao servidor compartilhado."""
+
+    def __init__(self, socket_path: str, authkey: bytes):
+        self.socket_path = socket_path
+        self.authkey = authkey
+        self._local = threading.local()
+
+    def _connection(self, fresh: bool = False):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or fresh:
+            conn = Client(self.socket_path, family="AF_UNIX", authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _request(self, texts: List[str]):
+        try:
+            conn = self._connection()
+            conn.send(texts)
+            return conn.recv()
+        except (EOFError, OSError):
+            # Servidor reiniciou ou a conexão caiu: uma nova tentativa
+            conn = self._connection(fresh=True)
+            conn.send(texts)
+            return conn.recv()
+
+    def encode(self, sentences, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        result = self._request(texts)
+        if isinstance(result, dict):
+            raise RuntimeError(f"Servidor de embeddings: {result['error']}")
+        return result[0] if single else result
+
+def remote_encoder_from_env():
+    """Retorna um RemoteEncoder se o processo foi iniciado pelo modo multi-worker, senão None."""
+    socket_path = os.getenv(SOCKET_ENV)
+    if not socket_path:
+        return None
+    return RemoteEncoder(socket_path, os.getenv(AUTHKEY_ENV, "").encode("utf-8"))
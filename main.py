@@ -1,4 +1,9 @@
 # [2025-08-01] Sempre coloque os imports no topo do script.
+import argparse
+import multiprocessing
+import os
+import secrets
+import tempfile
 import uvicorn
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -9,7 +14,8 @@ from dotenv import load_dotenv
 load_dotenv() 
 
 # Importa os roteadores
-from routers import rag, state, graph, auth, library, ingest  # noqa: E402
+from routers import rag, state, graph, auth, library, ingest, metrics, admission, lexical, session, profiling  # noqa: E402
+import embedding_server  # noqa: E402
 
 # --- Gerenciador de Ciclo de Vida ---
 @asynccontextmanager
@@ -19,6 +25,7 @@ async def lifespan(app: FastAPI):
     
     # Inicializa cada módulo
     rag.init_rag_module()
+    lexical.init_lexical_module()
     state.init_state_module()
     graph.init_graph_module()
     library.init_library_module()
@@ -39,6 +46,11 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Ordem (de fora para dentro): Metrics -> CORS -> Admission -> Profiling -> rotas
+# Assim o 429 da admissão sai com cabeçalhos CORS e entra nas métricas,
+# e o perfil cobre só o trabalho da rota (sem a espera na fila).
+app.add_middleware(profiling.ProfilingMiddleware)
+app.add_middleware(admission.AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -46,6 +58,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Registra as rotas
 app.include_router(auth.router)     # /auth
@@ -54,6 +67,58 @@ app.include_router(ingest.router)   # /ingest
 app.include_router(rag.router)      # /query (Vector)
 app.include_router(graph.router)    # /query (Graph)
 app.include_router(state.router)    # /state (Legacy/Debug)
+app.include_router(metrics.router)  # /metrics (Prometheus)
+app.include_router(session.router)  # /session/ws (WebSocket por aventura)
+app.include_router(profiling.router)  # /admin/profiles
+
+# --- Modo Produção (Multi-Worker) ---
+
+def run_production(workers: int, host: str, port: int):
+    """
+    Sobe um processo único com o modelo de embeddings e N workers do uvicorn.
+    Os workers herdam o caminho do socket pelo ambiente e não carregam o modelo.
+    """
+    if graph.GRAPH_BACKEND == "embedded":
+        raise SystemExit("❌ O backend de grafo embutido mantém o grafo em memória: use 1 worker.")
+    if not rag.CHROMA_HOST:
+        print("⚠️ [MAIN] CHROMA_HOST não definido: vários workers no mesmo PersistentClient podem corromper o índice.")
+
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="cronos_embed_"), "embed.sock")
+    authkey = secrets.token_hex(16)
+
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Event()
+    server = ctx.Process(
+        target=embedding_server.serve,
+        args=(socket_path, authkey.encode("utf-8"), rag.active_index()["model"], ready),
+        name="cronos-embeddings",
+        daemon=True,
+    )
+    server.start()
+    # Carregar o modelo pode levar minutos; só desiste se o processo morrer
+    while not ready.wait(timeout=1):
+        if not server.is_alive():
+            raise SystemExit("❌ Servidor de embeddings não iniciou.")
+
+    os.environ[embedding_server.SOCKET_ENV] = socket_path
+    os.environ[embedding_server.AUTHKEY_ENV] = authkey
+    # Limites de admissão divididos entre os workers; métricas ganham o rótulo worker
+    os.environ["CRONOS_WORKERS"] = str(workers)
+    print(f"ℹ️ [MAIN] {workers} workers: limites ADMISSION_* divididos entre eles; /metrics é por worker (rótulo 'worker').")
+    try:
+        uvicorn.run("main:app", host=host, port=port, workers=workers)
+    finally:
+        server.terminate()
+        server.join(timeout=10)
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Cronos Super Server")
+    parser.add_argument("--workers", type=int, default=1, help="> 1 ativa o modo produção com modelo compartilhado")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        run_production(args.workers, args.host, args.port)
+    else:
+        uvicorn.run("main:app", host=args.host, port=args.port, reload=True)
\ No newline at end of file
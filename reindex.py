@@ -0,0 +1,314 @@
+# [2025-08-01] Sempre coloque os imports no topo do script.
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Mesmo comportamento do main.py: variáveis de ambiente antes dos roteadores
+load_dotenv()
+
+from routers import rag  # noqa: E402
+
+# --- Re-embedding Offline ---
+# Reconstrói o índice vetorial com outro modelo/dimensão/layout sem perder memórias:
+#   1. lê os documentos da coleção ativa do Chroma em páginas;
+#   2. re-codifica em lotes grandes, espalhados por um pool de processos;
+#   3. grava (upsert, mesmos ids) numa coleção nova;
+#   4. ao terminar, troca o ponteiro active_index.json de forma atômica (os.replace).
+# Um checkpoint por página permite retomar do ponto em que parou. Como os ids são
+# preservados, o índice FTS5 (routers/lexical.py) continua válido após a troca.
+#
+# Os servidores leem o ponteiro no startup e continuam gravando na coleção antiga
+# até reiniciar. Para nenhuma memória ficar para trás:
+#   - antes da troca, uma passada de catch-up compara os ids das duas coleções e
+#     re-codifica o que foi ingerido durante a cópia (repete até não faltar nada);
+#   - depois de reiniciar os servidores, 'python reindex.py --catch-up' copia o que
+#     caiu na coleção anterior entre a troca e o restart. Depois do restart nada
+#     mais grava na coleção anterior, então essa passada final é completa.
+#
+# Uso:
+#   python reindex.py --model intfloat/multilingual-e5-base --workers 4
+#   python reindex.py --model ... --resume       (continua pelo checkpoint)
+#   python reindex.py --model ... --target-collection x --overwrite  (descarta 'x' se já existir)
+#   python reindex.py --catch-up                 (após reiniciar os servidores)
+#
+# Observação: o turn_logs guarda apenas o sqlData (status/inventário/mundo), não o
+# texto narrativo; a fonte de texto é sempre a coleção do Chroma.
+
+CHECKPOINT_PATH = "./reindex_checkpoint.json"
+MAX_CATCH_UP_PASSES = 5
+
+# --- Pool de Encoders ---
+
+_worker_model = None
+
+def _init_worker(model_name: str, device: str):
+    """Inicializador de cada processo do pool: carrega o modelo uma vez por processo."""
+    global _worker_model
+    from sentence_transformers import SentenceTransformer
+    _worker_model = SentenceTransformer(model_name, device=device)
+
+def _encode_batch(texts: List[str], batch_size: int) -> np.ndarray:
+    return np.asarray(_worker_model.encode(texts, batch_size=batch_size), dtype=np.float32)
+
+class InlineExecutor:
+    """Executor sem subprocessos (--workers 1, ou GPU única): mesma interface de map()."""
+
+    def __init__(self, model_name: str, device: str):
+        _init_worker(model_name, device)
+
+    def map(self, fn, *iterables):
+        return map(fn, *iterables)
+
+    def shutdown(self):
+        pass
+
+def _pick_device(requested: str) -> str:
+    if requested != "auto":
+        return requested
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+# --- Checkpoint ---
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_checkpoint(path: str, data: Dict[str, Any]):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+def swap_active_index(collection_name: str, model_name: str, previous: Dict[str, str]):
+    pointer = {
+        "collection": collection_name,
+        "model": model_name,
+        "previous": previous,
+        "swappedAt": datetime.now().isoformat(timespec="seconds"),
+    }
+    save_checkpoint(rag.ACTIVE_INDEX_PATH, pointer)
+
+def _protected_collections() -> set:
+    """Coleções que o reindex nunca apaga nem sobrescreve: a ativa e a anterior (fonte do --catch-up)."""
+    pointer = load_checkpoint(rag.ACTIVE_INDEX_PATH)
+    protected = {rag.active_index()["collection"]}
+    if pointer.get("previous"):
+        protected.add(pointer["previous"]["collection"])
+    return protected
+
+def _collection_exists(client, name: str) -> bool:
+    try:
+        client.get_collection(name=name)
+        return True
+    except Exception:
+        return False
+
+# --- Cópia e Catch-up ---
+
+def _make_executor(model_name: str, args):
+    device = _pick_device(args.device)
+    if args.workers > 1:
+        return ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(model_name, device))
+    return InlineExecutor(model_name, device)
+
+def _copy_page(page: Dict[str, Any], target, executor, args, max_write: int):
+    """Re-codifica uma página lida do Chroma (ids, documents, metadatas) e grava no destino."""
+    ids = page["ids"]
+    documents = [doc or "" for doc in page["documents"]]
+    texts = [f"{args.passage_prefix}{doc}" for doc in documents]
+    batches = [texts[i:i + args.batch_size] for i in range(0, len(texts), args.batch_size)]
+    embeddings = np.concatenate(list(executor.map(_encode_batch, batches, [args.batch_size] * len(batches))))
+
+    # Chroma limita o tamanho de cada escrita
+    for i in range(0, len(ids), max_write):
+        target.upsert(
+            ids=ids[i:i + max_write],
+            embeddings=embeddings[i:i + max_write].tolist(),
+            documents=documents[i:i + max_write],
+            metadatas=page["metadatas"][i:i + max_write],
+        )
+
+def _all_ids(collection, page_size: int) -> set:
+    ids = set()
+    offset = 0
+    while True:
+        page = collection.get(include=[], limit=page_size, offset=offset)
+        if not page["ids"]:
+            return ids
+        ids.update(page["ids"])
+        offset += len(page["ids"])
+
+def catch_up(source, target, executor, args, max_write: int) -> int:
+    """Copia para 'target' as memórias de 'source' que ainda não estão lá. Retorna quantas copiou."""
+    missing = sorted(_all_ids(source, args.page_size) - _all_ids(target, args.page_size))
+    for i in range(0, len(missing), args.page_size):
+        page = source.get(ids=missing[i:i + args.page_size], include=["documents", "metadatas"])
+        _copy_page(page, target, executor, args, max_write)
+    if missing:
+        print(f"🔁 [REINDEX] Catch-up: {len(missing)} memórias novas copiadas de '{source.name}'.")
+    return len(missing)
+
+# --- Pipeline ---
+
+def reindex(args) -> Dict[str, Any]:
+    source_index = rag.active_index()
+    client = rag.create_chroma_client()
+    source = client.get_collection(name=args.source_collection or source_index["collection"])
+
+    checkpoint = load_checkpoint(args.checkpoint) if args.resume else {}
+    if checkpoint and (checkpoint.get("model") != args.model or checkpoint.get("source") != source.name):
+        raise SystemExit("❌ Checkpoint é de outro modelo/coleção. Rode sem --resume para recomeçar.")
+
+    target_name = checkpoint.get("target") or args.target_collection or \
+        f"{rag.COLLECTION_NAME}__{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    if target_name in _protected_collections() or target_name == source.name:
+        raise SystemExit(f"❌ '{target_name}' é a coleção ativa, a anterior (usada pelo --catch-up) ou a "
+                         "origem: escolha outro --target-collection.")
+
+    if not checkpoint and _collection_exists(client, target_name):
+        # Recomeço limpo: só descarta o destino de uma execução anterior deste pipeline
+        # (o checkpoint deixado para trás) ou com --overwrite explícito
+        if not args.overwrite and load_checkpoint(args.checkpoint).get("target") != target_name:
+            raise SystemExit(f"❌ A coleção '{target_name}' já existe. Use --overwrite para descartá-la "
+                             "ou --resume para continuar a execução anterior.")
+        client.delete_collection(name=target_name)
+        print(f"🗑️ [REINDEX] Coleção '{target_name}' descartada para recomeçar.")
+    target = client.get_or_create_collection(
+        name=target_name,
+        metadata={"hnsw:space": args.space, "embedding_model": args.model}
+    )
+
+    offset = checkpoint.get("offset", 0)
+    processed = checkpoint.get("processed", 0)
+    total = source.count()
+    print(f"🔁 [REINDEX] '{source.name}' -> '{target_name}' com {args.model} "
+          f"({total} memórias, retomando em {offset}).")
+
+    executor = _make_executor(args.model, args)
+    max_write = min(args.page_size, client.get_max_batch_size())
+    started = time.perf_counter()
+    session_processed = 0
+    try:
+        while True:
+            page = source.get(include=["documents", "metadatas"], limit=args.page_size, offset=offset)
+            ids = page["ids"]
+            if not ids:
+                break
+
+            _copy_page(page, target, executor, args, max_write)
+
+            offset += len(ids)
+            processed += len(ids)
+            session_processed += len(ids)
+            save_checkpoint(args.checkpoint, {
+                "source": source.name, "target": target_name, "model": args.model,
+                "offset": offset, "processed": processed,
+            })
+
+            elapsed = time.perf_counter() - started
+            rate = session_processed / elapsed if elapsed else 0.0
+            print(f"🔁 [REINDEX] {processed}/{total} memórias | {rate:.1f} passagens/s")
+
+        # Memórias ingeridas durante a cópia (ou fora da ordem de paginação)
+        for _ in range(MAX_CATCH_UP_PASSES):
+            copied = catch_up(source, target, executor, args, max_write)
+            processed += copied
+            session_processed += copied
+            if not copied:
+                break
+    finally:
+        executor.shutdown()
+
+    elapsed = time.perf_counter() - started
+    report = {
+        "source": source.name,
+        "target": target_name,
+        "model": args.model,
+        "processed": processed,
+        "source_count": source.count(),
+        "target_count": target.count(),
+        "elapsed_s": round(elapsed, 2),
+        "passages_per_s": round(session_processed / elapsed, 1) if elapsed else 0.0,
+    }
+
+    # Compara com a contagem atual da origem (não a do início): ingests concorrentes contam
+    if report["target_count"] < report["source_count"]:
+        print(f"⚠️ [REINDEX] Destino tem {report['target_count']} de {report['source_count']} memórias: "
+              "ponteiro NÃO foi trocado (rode de novo com --resume).")
+        return report
+
+    if args.no_swap:
+        print(f"✅ [REINDEX] Coleção '{target_name}' pronta (troca desativada por --no-swap).")
+    else:
+        swap_active_index(target_name, args.model, source_index)
+        os.remove(args.checkpoint)
+        print(f"✅ [REINDEX] Índice ativo agora é '{target_name}' ({args.model}). "
+              "Reinicie os servidores e depois rode 'python reindex.py --catch-up'.")
+    return report
+
+def catch_up_after_swap(args) -> Dict[str, Any]:
+    """Passada final, depois do restart: copia o que foi gravado na coleção anterior após a troca."""
+    try:
+        with open(rag.ACTIVE_INDEX_PATH) as f:
+            pointer = json.load(f)
+    except FileNotFoundError:
+        raise SystemExit("❌ Nenhuma troca registrada em active_index.json.")
+    if not pointer.get("previous"):
+        raise SystemExit("❌ O ponteiro ativo não registra a coleção anterior.")
+
+    client = rag.create_chroma_client()
+    source = client.get_collection(name=pointer["previous"]["collection"])
+    target = client.get_collection(name=pointer["collection"])
+
+    executor = _make_executor(pointer["model"], args)
+    try:
+        copied = catch_up(source, target, executor, args, min(args.page_size, client.get_max_batch_size()))
+    finally:
+        executor.shutdown()
+
+    print(f"✅ [REINDEX] Catch-up concluído: {copied} memórias copiadas para '{target.name}'.")
+    return {"source": source.name, "target": target.name, "copied": copied,
+            "source_count": source.count(), "target_count": target.count()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embedding offline das memórias do Cronos.")
+    parser.add_argument("--model", default=None, help="Modelo SentenceTransformer de destino")
+    parser.add_argument("--source-collection", default=None, help="Padrão: coleção ativa")
+    parser.add_argument("--target-collection", default=None, help="Padrão: cronos_memory__<timestamp>")
+    parser.add_argument("--page-size", type=int, default=4096, help="Memórias lidas do Chroma por página")
+    parser.add_argument("--batch-size", type=int, default=256, help="Textos por encode em cada processo")
+    parser.add_argument("--workers", type=int, default=1, help="Processos de encode (cada um carrega o modelo)")
+    parser.add_argument("--device", default="auto", help="auto | cpu | cuda")
+    parser.add_argument("--passage-prefix", default="passage: ", help="Prefixo de documento (e5 exige 'passage: ')")
+    parser.add_argument("--space", default="cosine", help="hnsw:space da nova coleção")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--resume", action="store_true", help="Continua a partir do checkpoint")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Descarta uma coleção de destino já existente (nunca a ativa nem a anterior)")
+    parser.add_argument("--no-swap", action="store_true", help="Só constrói a coleção, sem trocar o ponteiro")
+    parser.add_argument("--catch-up", action="store_true",
+                        help="Após reiniciar os servidores: copia o que foi gravado na coleção anterior depois da troca")
+    args = parser.parse_args()
+
+    if args.catch_up:
+        report = catch_up_after_swap(args)
+    elif not args.model:
+        parser.error("--model é obrigatório (exceto com --catch-up)")
+    else:
+        report = reindex(args)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    sys.exit(main())
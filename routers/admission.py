@@ -0,0 +1,150 @@
+import os
+import json
+import asyncio
+from typing import Dict, Optional
+from routers import metrics
+
+# [2025-08-01] Sempre coloque os imports no topo do script.
+
+# --- Controle de Admissão ---
+# Cada classe de rota tem um limite de requisições simultâneas e uma fila de
+# espera limitada. Com a fila cheia (ou a espera estourando ADMISSION_MAX_WAIT_S)
+# o servidor responde 429 + Retry-After na hora, em vez de empilhar requisições
+# atrás do embedding_model.encode até o cliente desistir.
+#
+# Configuração por classe (0 desativa o limite da classe):
+#   ADMISSION_<CLASSE>_CONCURRENCY, ADMISSION_<CLASSE>_QUEUE
+#   classes: INGEST, VECTOR, GRAPH, LIBRARY
+#
+# Os limites valem para o servidor inteiro. No modo multi-worker (main.py --workers N)
+# todos os workers disputam o mesmo servidor de embeddings, então cada worker fica
+# com ceil(limite / N); o número de workers chega pelo ambiente (CRONOS_WORKERS).
+# Os contadores e gauges continuam sendo por processo (ver routers/metrics.py).
+
+MAX_WAIT_S = float(os.getenv("ADMISSION_MAX_WAIT_S", "10"))
+RETRY_AFTER_S = int(os.getenv("ADMISSION_RETRY_AFTER_S", "2"))
+WORKERS = max(1, int(os.getenv("CRONOS_WORKERS", "1")))
+
+# (prefixo do path, classe) — o primeiro prefixo que casar vence
+ROUTE_CLASSES = (
+    ("/ingest", "ingest"),
+    ("/query/vector", "vector"),
+    ("/query/graph", "graph"),
+    ("/library", "library"),
+    ("/auth", "library"),
+)
+
+DEFAULTS = {
+    "ingest": (4, 32),
+    "vector": (8, 64),
+    "graph": (16, 128),
+    "library": (16, 128),
+}
+
+class RouteClassLimiter:
+    def __init__(self, name: str, concurrency: int, queue_size: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def acquire(self) -> bool:
+        if not self._slots.locked():
+            # Vaga livre: acquire() retorna sem ceder o loop
+            await self._slots.acquire()
+            self.in_flight += 1
+            return True
+
+        # Sem vaga e fila cheia: recusa sem esperar
+        if self.waiting >= self.queue_size:
+            return self._reject()
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), MAX_WAIT_S)
+        except asyncio.TimeoutError:
+            return self._reject()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+    def _reject(self) -> bool:
+        self.rejected += 1
+        metrics.inc("cronos_admission_rejected_total", route_class=self.name)
+        return False
+
+def _build_limiters() -> Dict[str, RouteClassLimiter]:
+    limiters = {}
+    for name, (concurrency, queue_size) in DEFAULTS.items():
+        concurrency = int(os.getenv(f"ADMISSION_{name.upper()}_CONCURRENCY", concurrency))
+        queue_size = int(os.getenv(f"ADMISSION_{name.upper()}_QUEUE", queue_size))
+        if concurrency > 0:
+            # Divisão arredondada para cima: cada worker mantém pelo menos uma vaga
+            concurrency = -(-concurrency // WORKERS)
+            queue_size = -(-queue_size // WORKERS)
+            limiters[name] = RouteClassLimiter(name, concurrency, queue_size)
+    return limiters
+
+# --- Globais ---
+limiters: Dict[str, RouteClassLimiter] = _build_limiters()
+
+def classify(path: str) -> Optional[str]:
+    for prefix, name in ROUTE_CLASSES:
+        if path.startswith(prefix):
+            return name
+    return None
+
+def _gauges():
+    for limiter in limiters.values():
+        labels = {"route_class": limiter.name}
+        yield "cronos_admission_in_flight", labels, limiter.in_flight
+        yield "cronos_admission_queue_depth", labels, limiter.waiting
+
+metrics.register_gauges(_gauges)
+
+# --- Middleware ---
+
+class AdmissionMiddleware:
+    """Middleware ASGI: aplica o limite da classe da rota antes de chegar ao handler."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+
+        limiter = limiters.get(classify(scope["path"]))
+        if limiter is None:
+            return await self.app(scope, receive, send)
+
+        if not await limiter.acquire():
+            print(f"🚦 [ADMISSION] '{limiter.name}' saturada ({limiter.in_flight} ativas, {limiter.waiting} na fila) -> 429")
+            return await _send_429(send, limiter.name)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+async def _send_429(send, route_class: str):
+    body = json.dumps({"detail": f"Servidor ocupado ({route_class}). Tente novamente em {RETRY_AFTER_S}s."}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(RETRY_AFTER_S).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -4,6 +4,7 @@ import uuid
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from routers import graph # Importa o módulo, não a variável direta
+from routers import metrics
 
 # Configuração de Logs
 logging.basicConfig(level=logging.INFO)
@@ -31,7 +32,7 @@ async def login(req: AuthRequest):
     """
     
     try:
-        with graph.driver.session() as session:
+        with metrics.track("neo4j.login"), graph.driver.session() as session:
             result = session.run(cypher, username=req.username)
             record = result.single()
             
@@ -81,7 +82,7 @@ async def register(req: AuthRequest):
     """
     
     try:
-        with graph.driver.session() as session:
+        with metrics.track("neo4j.register"), graph.driver.session() as session:
             # 1. Verifica se usuário já existe
             if session.run(check_cypher, username=req.username).single():
                 raise HTTPException(status_code=400, detail="Nome de usuário já existe")
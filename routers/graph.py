@@ -3,6 +3,8 @@ from fastapi import APIRouter
 from pydantic import BaseModel
 from typing import Dict, Any, List
 from neo4j import GraphDatabase
+from routers import metrics
+from routers.graph_store import GraphStore, Neo4jGraphStore, EmbeddedGraphStore
 
 # [2025-08-01] Sempre coloque os imports no topo do script.
 
@@ -16,7 +18,13 @@ URI = os.getenv("NEO4J_URI")
 USER = os.getenv("NEO4J_USER")
 PASSWORD = os.getenv("NEO4J_PASSWORD")
 
+# Backend das arestas de entidades (ingest + /query/graph): 'neo4j' | 'embedded'
+# Auth e Library continuam usando o driver do Neo4j diretamente.
+GRAPH_BACKEND = os.getenv("GRAPH_BACKEND", "neo4j").lower()
+GRAPH_EMBEDDED_PATH = os.getenv("GRAPH_EMBEDDED_PATH", "./graph_store.db")
+
 driver = None
+store: GraphStore = None
 
 class GraphEntityQuery(BaseModel):
     entity: str
@@ -25,7 +33,7 @@ class GraphEntityQuery(BaseModel):
     depth: int = 1
 
 def init_graph_module():
-    global driver
+    global driver, store
     print("🕸️ [GRAPH] Conectando ao Neo4j...")
     
     # [DEBUG] Mostra quais credenciais estão sendo usadas de fato
@@ -39,14 +47,22 @@ def init_graph_module():
     except Exception as e:
         print(f"⚠️ [GRAPH] Aviso: Não foi possível conectar ao Neo4j ({e}).")
 
+    if GRAPH_BACKEND == "embedded":
+        store = EmbeddedGraphStore(GRAPH_EMBEDDED_PATH)
+        print(f"✅ [GRAPH] Backend embutido pronto ({store.entity_count()} entidades em '{GRAPH_EMBEDDED_PATH}').")
+    elif driver:
+        store = Neo4jGraphStore(driver)
+
 def close_graph_module():
+    if store:
+        store.close()
     if driver:
         driver.close()
 
 # --- Funções Internas ---
 
 async def internal_ingest_edges(edges: List[Dict[str, Any]], universe_id: str, user_id: str):
-    if not driver:
+    if not store:
         return
     
     # Prepara os dados: garante que 'properties' seja um dict válido para o APOC não falhar
@@ -57,67 +73,29 @@ async def internal_ingest_edges(edges: List[Dict[str, Any]], universe_id: str, u
             e_copy["properties"] = {}
         prepared_edges.append(e_copy)
 
-    # Query Cypher otimizada para Merge (Upsert) em lote
-    # Requer plugin APOC instalado no Neo4j (apoc.create.relationship)
-    cypher = """
-    MATCH (u:Universe {id: $universeId})
-    UNWIND $edges AS edge
-    MERGE (s:Entity {name: edge.subject, universeId: $universeId, userId: $userId})
-    MERGE (o:Entity {name: edge.object, universeId: $universeId, userId: $userId})
-    
-    MERGE (u)-[:CONTAINS]->(s)
-    MERGE (u)-[:CONTAINS]->(o)
-    
-    WITH s, o, edge
-    CALL apoc.create.relationship(s, edge.relation, edge.properties, o) YIELD rel
-    RETURN count(rel) as rel_count
-    """
-    
     try:
-        with driver.session() as session:
-            result = session.run(cypher, {
-                "edges": prepared_edges,
-                "universeId": universe_id,
-                "userId": user_id
-            })
-            summary = result.single()
-            count = summary["rel_count"] if summary else 0
-            print(f"🕸️ [GRAPH] {count} arestas processadas (Lote otimizado).")
+        with metrics.track(f"{store.name}.ingest_edges"):
+            count = store.ingest_edges(prepared_edges, universe_id, user_id)
+        print(f"🕸️ [GRAPH] {count} arestas processadas (Lote otimizado).")
             
     except Exception as e:
         print(f"❌ [GRAPH] Erro ao ingerir arestas (Verifique se o APOC está instalado): {e}")
 
+async def internal_query_graph(entity: str, universe_id: str, user_id: str) -> List[Dict[str, Any]]:
+    if not store:
+        return []
+    
+    with metrics.track(f"{store.name}.query_graph"):
+        results = store.neighborhood(entity, universe_id, user_id)
+    print(f"🕸️ [GRAPH] Busca '{entity}' -> {len(results)} conexões.")
+    return results
+
 # --- Rotas ---
 
 @router.post("/graph")
 async def query_graph_context(req: GraphEntityQuery):
-    if not driver:
-        return {"edges": []}
-    
-    # Busca nós conectados à entidade especificada
-    cypher = """
-    MATCH (n:Entity {name: $entity, universeId: $universeId, userId: $userId})-[r]-(m:Entity)
-    RETURN n.name as subject, type(r) as relation, m.name as object, properties(r) as props
-    LIMIT 50
-    """
-    
     try:
-        records, summary = driver.execute_query(
-            cypher, 
-            {"entity": req.entity, "universeId": req.universeId, "userId": req.userId}, 
-            database_="neo4j"
-        )
-        
-        results = []
-        for record in records:
-            results.append({
-                "subject": record["subject"],
-                "relation": record["relation"],
-                "object": record["object"],
-                "properties": record["props"]
-            })
-            
-        print(f"🕸️ [GRAPH] Busca '{req.entity}' -> {len(results)} conexões.")
+        results = await internal_query_graph(req.entity, req.universeId, req.userId)
         return {"edges": results}
     except Exception as e:
         print(f"❌ [GRAPH] Erro Cypher: {e}")
@@ -126,18 +104,17 @@ async def query_graph_context(req: GraphEntityQuery):
 # --- Execução Standalone (Manutenção) ---
 
 def reset_database():
-    if not driver:
+    if not store:
         print("❌ [GRAPH] Driver não conectado.")
         return
     
-    print("\n⚠️  PERIGO: Isso apagará TODOS os nós e relacionamentos do Neo4j!")
+    print(f"\n⚠️  PERIGO: Isso apagará TODOS os nós e relacionamentos do backend '{store.name}'!")
     confirm = input("Digite 'DELETAR' para confirmar: ")
     
     if confirm == "DELETAR":
         try:
-            with driver.session() as session:
-                session.run("MATCH (n) DETACH DELETE n")
-            print("✅ [GRAPH] Banco de dados limpo com sucesso (MATCH (n) DETACH DELETE n).")
+            store.reset()
+            print(f"✅ [GRAPH] Banco de dados '{store.name}' limpo com sucesso.")
         except Exception as e:
             print(f"❌ [GRAPH] Erro ao resetar: {e}")
     else:
@@ -0,0 +1,182 @@
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, Any, List, Tuple
+
+# [2025-08-01] Sempre coloque os imports no topo do script.
+
+# --- Backends de Grafo ---
+# O graph.py escolhe um destes pela variável GRAPH_BACKEND. Ambos respondem às
+# mesmas operações (ingestão de arestas e vizinhança de uma entidade), então podem
+# ser trocados por configuração e comparados lado a lado no benchmark.py.
+
+NEIGHBORHOOD_LIMIT = 50
+
+class GraphStore(ABC):
+    """Interface comum dos backends de grafo."""
+    name = "base"
+
+    @abstractmethod
+    def ingest_edges(self, edges: List[Dict[str, Any]], universe_id: str, user_id: str) -> int:
+        """Grava as arestas (subject, relation, object, properties) e retorna quantas foram criadas."""
+
+    @abstractmethod
+    def neighborhood(self, entity: str, universe_id: str, user_id: str, limit: int = NEIGHBORHOOD_LIMIT) -> List[Dict[str, Any]]:
+        """Arestas ligadas à entidade, em qualquer direção, no formato {subject, relation, object, properties}."""
+
+    @abstractmethod
+    def reset(self):
+        """Apaga todas as entidades e arestas do backend."""
+
+    def close(self):
+        pass
+
+# --- Neo4j (Padrão) ---
+
+class Neo4jGraphStore(GraphStore):
+    name = "neo4j"
+
+    # Query Cypher otimizada para Merge (Upsert) em lote
+    # Requer plugin APOC instalado no Neo4j (apoc.create.relationship)
+    INGEST_CYPHER = """
+    MATCH (u:Universe {id: $universeId})
+    UNWIND $edges AS edge
+    MERGE (s:Entity {name: edge.subject, universeId: $universeId, userId: $userId})
+    MERGE (o:Entity {name: edge.object, universeId: $universeId, userId: $userId})
+
+    MERGE (u)-[:CONTAINS]->(s)
+    MERGE (u)-[:CONTAINS]->(o)
+
+    WITH s, o, edge
+    CALL apoc.create.relationship(s, edge.relation, edge.properties, o) YIELD rel
+    RETURN count(rel) as rel_count
+    """
+
+    # Busca nós conectados à entidade especificada
+    NEIGHBORHOOD_CYPHER = """
+    MATCH (n:Entity {name: $entity, universeId: $universeId, userId: $userId})-[r]-(m:Entity)
+    RETURN n.name as subject, type(r) as relation, m.name as object, properties(r) as props
+    LIMIT $limit
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def ingest_edges(self, edges, universe_id, user_id):
+        with self.driver.session() as session:
+            result = session.run(self.INGEST_CYPHER, {
+                "edges": edges,
+                "universeId": universe_id,
+                "userId": user_id
+            })
+            summary = result.single()
+            return summary["rel_count"] if summary else 0
+
+    def neighborhood(self, entity, universe_id, user_id, limit=NEIGHBORHOOD_LIMIT):
+        records, _, _ = self.driver.execute_query(
+            self.NEIGHBORHOOD_CYPHER,
+            {"entity": entity, "universeId": universe_id, "userId": user_id, "limit": limit},
+            database_="neo4j"
+        )
+        return [
+            {
+                "subject": record["subject"],
+                "relation": record["relation"],
+                "object": record["object"],
+                "properties": record["props"]
+            }
+            for record in records
+        ]
+
+    def reset(self):
+        with self.driver.session() as session:
+            session.run("MATCH (n) DETACH DELETE n")
+
+# --- Embutido (Single-Node) ---
+
+class EmbeddedGraphStore(GraphStore):
+    """
+    Grafo em memória (listas de adjacência indexadas por (userId, universeId, name))
+    com persistência write-through em SQLite. Sem rede e sem APOC: pensado para
+    deployments pequenos, com poucos milhares de entidades por universo.
+    """
+    name = "embedded"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # (userId, universeId, name) -> [(subject, relation, object, properties)]
+        self._adjacency: Dict[Tuple[str, str, str], List[Tuple[str, str, str, Dict[str, Any]]]] = defaultdict(list)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS graph_edges (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT,
+                universe_id TEXT,
+                subject TEXT,
+                relation TEXT,
+                object TEXT,
+                properties_json TEXT
+            )
+        ''')
+        self._conn.commit()
+        self._load()
+
+    def _load(self):
+        rows = self._conn.execute(
+            "SELECT user_id, universe_id, subject, relation, object, properties_json FROM graph_edges ORDER BY id"
+        ).fetchall()
+        for user_id, universe_id, subject, relation, obj, props in rows:
+            self._link(user_id, universe_id, subject, relation, obj, json.loads(props) if props else {})
+
+    def _link(self, user_id, universe_id, subject, relation, obj, props):
+        edge = (subject, relation, obj, props)
+        self._adjacency[(user_id, universe_id, subject)].append(edge)
+        if obj != subject:
+            self._adjacency[(user_id, universe_id, obj)].append(edge)
+
+    def entity_count(self) -> int:
+        return len(self._adjacency)
+
+    def ingest_edges(self, edges, universe_id, user_id):
+        rows = [
+            (user_id, universe_id, e["subject"], e["relation"], e["object"], json.dumps(e.get("properties") or {}))
+            for e in edges
+        ]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO graph_edges (user_id, universe_id, subject, relation, object, properties_json) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+            for e in edges:
+                self._link(user_id, universe_id, e["subject"], e["relation"], e["object"], e.get("properties") or {})
+        return len(rows)
+
+    def neighborhood(self, entity, universe_id, user_id, limit=NEIGHBORHOOD_LIMIT):
+        with self._lock:
+            adjacent = list(self._adjacency.get((user_id, universe_id, entity), ())[:limit])
+
+        # Mesmo formato do Neo4j: 'subject' é sempre a entidade buscada
+        results = []
+        for subject, relation, obj, props in adjacent:
+            results.append({
+                "subject": entity,
+                "relation": relation,
+                "object": obj if subject == entity else subject,
+                "properties": dict(props)
+            })
+        return results
+
+    def reset(self):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM graph_edges")
+            self._adjacency.clear()
+
+    def close(self):
+        self._conn.close()
@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
-from . import rag, state, graph
+from . import rag, state, graph, metrics
 
 # [2025-08-01] Sempre coloque os imports no topo do script.
 
@@ -86,7 +86,9 @@ async def ingest_unified(payload: UnifiedIngestPayload):
             errors.append(f"Graph Error: {str(e)}")
 
     if errors:
+        metrics.inc("cronos_ingest_results_total", status="partial_success")
         return {"status": "partial_success", "errors": errors}
     
+    metrics.inc("cronos_ingest_results_total", status="success")
     print("✅ [INGEST] Turno processado com sucesso.")
     return {"status": "success"}
\ No newline at end of file
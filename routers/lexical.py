@@ -0,0 +1,127 @@
+import os
+import re
+import sqlite3
+import hashlib
+from typing import Dict, Any, List, Tuple
+from routers import metrics
+
+# [2025-08-01] Sempre coloque os imports no topo do script.
+
+# --- Índice Léxico (SQLite FTS5) ---
+# Nomes exatos (NPCs, itens, lugares) são onde o e5 mais erra. Este índice BM25
+# é mantido pelo ingest junto com o Chroma e usado pelo modo híbrido do /query/vector.
+# Fica num arquivo separado do world_state.db para não disputar o lock de escrita
+# com o log de turnos.
+
+LEXICAL_PATH = os.getenv("LEXICAL_INDEX_PATH", "./lexical_index.db")
+MAX_QUERY_TERMS = 16
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# --- Inicialização ---
+def init_lexical_module():
+    print("🔤 [LEXICAL] Verificando índice FTS5...")
+    conn = sqlite3.connect(LEXICAL_PATH)
+    # 'scope' é um token único por (userId, universeId): o MATCH filtra o escopo
+    # pelo próprio índice invertido, sem varrer memórias de outros usuários.
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5(
+            text,
+            scope,
+            doc_id UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    ''')
+    conn.commit()
+    conn.close()
+    print("✅ [LEXICAL] Índice FTS5 pronto.")
+
+# --- Helpers ---
+
+def _scope_token(user_id: str, universe_id: str) -> str:
+    return "s" + hashlib.sha1(f"{user_id}\x1f{universe_id}".encode("utf-8")).hexdigest()[:20]
+
+def _match_expression(query: str) -> str:
+    """Transforma texto livre numa expressão FTS5 segura (termos entre aspas, unidos por OR)."""
+    terms = []
+    for token in _TOKEN_RE.findall(query.lower()):
+        if token not in terms:
+            terms.append(token)
+    return " OR ".join(f'"{term}"' for term in terms[:MAX_QUERY_TERMS])
+
+# --- Funções Internas ---
+
+def index_documents(docs: List[Tuple[str, str]], user_id: str, universe_id: str):
+    """Indexa [(doc_id, texto)] no escopo do usuário/universo."""
+    scope = _scope_token(user_id, universe_id)
+    with metrics.track("sqlite.fts_index"):
+        conn = sqlite3.connect(LEXICAL_PATH)
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO memory_fts (text, scope, doc_id) VALUES (?, ?, ?)",
+                    [(text, scope, doc_id) for doc_id, text in docs]
+                )
+        finally:
+            conn.close()
+
+def search(query: str, user_id: str, universe_id: str, limit: int) -> List[Dict[str, Any]]:
+    """Top 'limit' documentos por BM25 dentro do escopo. Retorna [{id, document, score}]."""
+    expression = _match_expression(query)
+    if not expression:
+        return []
+
+    match = f'scope:"{_scope_token(user_id, universe_id)}" AND ({expression})'
+    with metrics.track("sqlite.fts_search"):
+        conn = sqlite3.connect(LEXICAL_PATH)
+        try:
+            # bm25(): menor = mais relevante. Peso zero na coluna scope.
+            rows = conn.execute('''
+                SELECT doc_id, text, bm25(memory_fts, 1.0, 0.0) AS score
+                FROM memory_fts
+                WHERE memory_fts MATCH ?
+                ORDER BY score
+                LIMIT ?
+            ''', (match, limit)).fetchall()
+        finally:
+            conn.close()
+
+    return [{"id": doc_id, "document": text, "score": score} for doc_id, text, score in rows]
+
+# --- Execução Standalone (Manutenção) ---
+
+def backfill_from_collection(collection, page_size: int = 1000) -> int:
+    """Reindexa todas as memórias já existentes no Chroma (idempotente: limpa o índice antes)."""
+    conn = sqlite3.connect(LEXICAL_PATH)
+    with conn:
+        conn.execute("DELETE FROM memory_fts")
+    conn.close()
+
+    total = 0
+    offset = 0
+    while True:
+        page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            break
+
+        by_scope: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        for doc_id, text, meta in zip(page["ids"], page["documents"], page["metadatas"]):
+            meta = meta or {}
+            key = (meta.get("userId", ""), meta.get("universeId", ""))
+            by_scope.setdefault(key, []).append((doc_id, text or ""))
+        for (user_id, universe_id), docs in by_scope.items():
+            index_documents(docs, user_id, universe_id)
+
+        total += len(page["ids"])
+        offset += page_size
+        print(f"🔤 [LEXICAL] {total} memórias indexadas...")
+    return total
+
+if __name__ == "__main__":
+    # python -m routers.lexical  -> reconstrói o índice a partir do Chroma
+    from routers import rag
+
+    init_lexical_module()
+    client = rag.create_chroma_client()
+    count = backfill_from_collection(client.get_or_create_collection(name=rag.active_index()["collection"]))
+    print(f"✅ [LEXICAL] Backfill concluído: {count} memórias.")
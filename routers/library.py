@@ -5,6 +5,7 @@ from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 from routers import graph # Importa o módulo para acesso dinâmico ao driver
+from routers import metrics
 
 # Configuração de Logs
 logging.basicConfig(level=logging.INFO)
@@ -71,7 +72,7 @@ def init_library_module():
 
 async def process_graph_context(context: List[Dict], universe_id: str, user_id: str):
     """Transforma o contexto do frontend (source/target) para o formato do graph ingest (subject/object)."""
-    if not context or not graph.driver:
+    if not context or not graph.store:
         return
     
     edges = []
@@ -102,7 +103,7 @@ async def get_user_library(user_id: str):
             "adventures": []
         }
         
-        with graph.driver.session() as session:
+        with metrics.track("neo4j.get_library"), graph.driver.session() as session:
             # 1. Busca Universos
             result_uni = session.run("MATCH (user:User {userId: $userId})-[:CREATED]->(u:Universe) RETURN u", userId=user_id)
             data["universes"] = [dict(record["u"]) for record in result_uni]
@@ -156,7 +157,7 @@ async def save_universe(item: UniverseModel):
         params["championsStr"] = json.dumps(item.champions)
         params["worldsStr"] = json.dumps(item.worlds)
 
-        with graph.driver.session() as session:
+        with metrics.track("neo4j.save_universe"), graph.driver.session() as session:
             session.run(cypher, params)
         
         # Processa o contexto de grafo (se houver)
@@ -194,7 +195,7 @@ async def save_character(item: CharacterModel):
         params = item.dict()
         params["stats"] = json.dumps(item.stats)
 
-        with graph.driver.session() as session:
+        with metrics.track("neo4j.save_character"), graph.driver.session() as session:
             session.run(cypher, params)
 
         # Processa o contexto de grafo (se houver)
@@ -236,7 +237,7 @@ async def save_adventure(item: AdventureModel):
     RETURN a.id
     """
     try:
-        with graph.driver.session() as session:
+        with metrics.track("neo4j.save_adventure"), graph.driver.session() as session:
             # exclude={"messages"} pois mensagens não vão pro grafo dessa forma
             session.run(cypher, item.dict(exclude={"messages"}))
             
@@ -263,7 +264,7 @@ async def delete_universe(item_id: str, userId: str = Query(...)):
     DETACH DELETE u, a
     """
     try:
-        with graph.driver.session() as session:
+        with metrics.track("neo4j.delete_universe"), graph.driver.session() as session:
             result = session.run(cypher, id=item_id, userId=userId)
             result.consume()
             logger.info(f"Universo {item_id} deletado.")
@@ -283,7 +284,7 @@ async def delete_character(item_id: str, userId: str = Query(...)):
     DELETE r
     """
     try:
-        with graph.driver.session() as session:
+        with metrics.track("neo4j.delete_character"), graph.driver.session() as session:
             session.run(cypher, id=item_id, userId=userId)
         return {"status": "archived", "id": item_id}
     except Exception as e:
@@ -303,7 +304,7 @@ async def delete_adventure(item_id: str, userId: str = Query(...)):
     DETACH DELETE a
     """
     try:
-        with graph.driver.session() as session:
+        with metrics.track("neo4j.delete_adventure"), graph.driver.session() as session:
             session.run(cypher, id=item_id, userId=userId)
         return {"status": "deleted", "id": item_id}
     except Exception as e:
@@ -0,0 +1,192 @@
+import os
+import time
+import threading
+import contextvars
+from bisect import bisect_left
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# [2025-08-01] Sempre coloque os imports no topo do script.
+
+router = APIRouter(tags=["metrics"])
+
+# Métricas são por processo. No modo multi-worker (main.py --workers N) cada scrape
+# do /metrics cai num worker qualquer, por isso toda série ganha o rótulo
+# worker="<pid>": o Prometheus guarda uma série por worker e a soma entre elas
+# (sum without (worker)) dá o total do servidor.
+
+# --- Configuração ---
+# Buckets em segundos (do encode em GPU, ~ms, até um ingest lento, ~s)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_METRIC = "cronos_stage_duration_seconds"
+ROUTE_METRIC = "cronos_request_duration_seconds"
+ERROR_METRIC = "cronos_errors_total"
+WORKER_LABEL = f'worker="{os.getpid()}"' if int(os.getenv("CRONOS_WORKERS", "1")) > 1 else ""
+
+HELP = {
+    STAGE_METRIC: "Duração de cada etapa interna (encode, chroma, neo4j, sqlite).",
+    ROUTE_METRIC: "Duração das requisições HTTP por rota.",
+    ERROR_METRIC: "Exceções por etapa interna.",
+    "cronos_ingest_results_total": "Resultados do /ingest/unified por status.",
+    "cronos_admission_rejected_total": "Requisições recusadas com 429 por classe de rota.",
+    "cronos_admission_in_flight": "Requisições em execução por classe de rota.",
+    "cronos_admission_queue_depth": "Requisições aguardando vaga por classe de rota.",
+}
+
+# --- Globais ---
+# (nome, labels ordenados) -> [contagens por bucket..., +Inf, soma]
+_histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], list] = {}
+_counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+_lock = threading.Lock()
+# Gauges são lidos só no scrape: cada provedor devolve [(nome, {labels}, valor)]
+_gauge_providers: List[Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]] = []
+# Lista de spans da requisição sendo perfilada (routers/profiling.py); None fora de um perfil
+span_recorder: contextvars.ContextVar = contextvars.ContextVar("cronos_span_recorder", default=None)
+
+# --- API de Instrumentação ---
+
+def observe(name: str, seconds: float, **labels: str):
+    key = (name, tuple(sorted(labels.items())))
+    idx = bisect_left(BUCKETS, seconds)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        hist[idx] += 1
+        hist[-1] += seconds
+
+def inc(name: str, amount: float = 1, **labels: str):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def register_gauges(provider: Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]):
+    _gauge_providers.append(provider)
+
+class track:
+    """
+    Cronometra uma etapa: `with metrics.track("chroma.add"): ...`
+    Exceções que atravessam o bloco também contam em cronos_errors_total
+    (HTTPException é resposta intencional, não erro da etapa).
+    """
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        observe(STAGE_METRIC, end - self.start, stage=self.stage)
+        spans = span_recorder.get()
+        if spans is not None:
+            spans.append((self.stage, self.start, end, exc_type is not None))
+        if exc_type is not None and not issubclass(exc_type, HTTPException):
+            inc(ERROR_METRIC, stage=self.stage)
+        return False
+
+# --- Middleware ---
+
+class MetricsMiddleware:
+    """Middleware ASGI puro (sem o custo do BaseHTTPMiddleware) que mede cada rota."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Usa o template da rota (/library/{user_id}) para não explodir a cardinalidade
+            route = scope.get("route")
+            observe(
+                ROUTE_METRIC,
+                time.perf_counter() - start,
+                route=getattr(route, "path", "unmatched"),
+                method=scope["method"],
+                status=str(status["code"]),
+            )
+
+def snapshot(name: str) -> Dict[Tuple[Tuple[str, str], ...], Tuple[int, float]]:
+    """(contagem, soma) de cada série do histograma 'name', para relatórios internos."""
+    with _lock:
+        return {
+            labels: (sum(hist[:-1]), hist[-1])
+            for (metric, labels), hist in _histograms.items() if metric == name
+        }
+
+# --- Exposição (Formato Texto do Prometheus) ---
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if WORKER_LABEL:
+        parts.append(WORKER_LABEL)
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def render() -> str:
+    with _lock:
+        histograms = {key: list(values) for key, values in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    seen = set()
+    for (name, labels), hist in sorted(histograms.items()):
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, count in zip(BUCKETS, hist):
+            cumulative += count
+            le = _format_labels(labels, f'le="{bound}"')
+            lines.append(f"{name}_bucket{le} {cumulative}")
+        cumulative += hist[len(BUCKETS)]
+        le = _format_labels(labels, 'le="+Inf"')
+        lines.append(f"{name}_bucket{le} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {hist[-1]}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+
+    for (name, labels), value in sorted(counters.items()):
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    gauges = sorted(
+        (name, tuple(sorted(labels.items())), value)
+        for provider in _gauge_providers
+        for name, labels, value in provider()
+    )
+    for name, labels, value in gauges:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
+
+# --- Rotas ---
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,268 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import secrets
+import threading
+from collections import Counter
+from datetime import datetime
+from fastapi import APIRouter, Header, HTTPException
+from typing import Dict, Any, List, Optional
+from routers import metrics
+
+# [2025-08-01] Sempre coloque os imports no topo do script.
+
+router = APIRouter(prefix="/admin/profiles", tags=["admin"])
+
+# --- Perfil por Requisição (Opt-in) ---
+# Para descobrir por que UMA chamada ficou lenta (tokenização, forward do modelo,
+# busca HNSW, Cypher, SQLite...), uma requisição pode ser perfilada:
+#   - sob demanda: cabeçalho 'X-Cronos-Profile: <CRONOS_ADMIN_TOKEN>';
+#   - por amostragem: PROFILE_SAMPLE_RATE (0.0 a 1.0) nas rotas de PROFILE_SAMPLED_PATHS.
+# O perfil junta:
+#   - amostras de pilha da thread do event loop a cada PROFILE_INTERVAL_MS
+#     (formato "collapsed", aceito por flamegraph.pl / speedscope);
+#   - a linha do tempo dos spans do metrics.track (rag, graph, state, ingest...).
+# A thread do event loop também roda outras requisições enquanto a perfilada está
+# suspensa num await. Por isso cada amostra só entra nas pilhas quando a task em
+# execução é a da requisição perfilada; as demais são contadas à parte
+# (otherTaskSamples / idleSamples), junto com as requisições simultâneas
+# (concurrentRequests). A atribuição é aproximada (a troca de task pode ocorrer
+# entre as leituras) e trabalho mandado para outras threads não aparece.
+# Os arquivos ficam em PROFILE_DIR, limitados aos PROFILE_MAX_FILES mais recentes,
+# e são listados em GET /admin/profiles (cabeçalho 'X-Cronos-Admin-Token').
+#
+# Só um perfil por processo por vez (um amostrador por thread do event loop).
+# Sem CRONOS_ADMIN_TOKEN, o cabeçalho é ignorado e as rotas de admin respondem 404.
+
+ADMIN_TOKEN = os.getenv("CRONOS_ADMIN_TOKEN", "")
+PROFILE_HEADER = b"x-cronos-profile"
+PROFILE_ID_HEADER = b"x-cronos-profile-id"
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SAMPLED_PATHS = tuple(
+    p for p in os.getenv("PROFILE_SAMPLED_PATHS", "/ingest/unified,/query/vector").split(",") if p
+)
+MAX_STACK_DEPTH = 128
+
+# --- Globais ---
+_active_lock = threading.Lock()
+_in_flight = 0  # Requisições HTTP em andamento neste processo
+_peak_in_flight = 0  # Pico de _in_flight durante o perfil ativo
+
+# --- Amostrador de Pilha ---
+
+def _collapse(frame) -> str:
+    """Pilha da raiz até o frame atual: 'func (arquivo:linha);...'."""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+class StackSampler(threading.Thread):
+    """
+    Lê a pilha da thread do event loop em intervalos fixos (sys._current_frames),
+    atribuindo a amostra à requisição só quando 'task' é a task em execução.
+    """
+
+    def __init__(self, thread_id: int, interval_s: float, loop: asyncio.AbstractEventLoop, task: asyncio.Task):
+        super().__init__(name="cronos-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.loop = loop
+        self.task = task
+        self.stacks: Counter = Counter()
+        self.other_task_samples = 0
+        self.idle_samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval_s):
+            running = asyncio.current_task(self.loop)
+            frame = sys._current_frames().get(self.thread_id)
+            if running is None:
+                self.idle_samples += 1
+            elif running is not self.task or asyncio.current_task(self.loop) is not self.task:
+                self.other_task_samples += 1
+            elif frame is not None:
+                self.stacks[_collapse(frame)] += 1
+
+    def stop(self) -> Counter:
+        self._stop_event.set()
+        self.join()
+        return self.stacks
+
+# --- Armazenamento ---
+
+def _is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and secrets.compare_digest(token, ADMIN_TOKEN)
+
+def _profile_path(profile_id: str) -> str:
+    return os.path.join(PROFILE_DIR, f"{profile_id}.json")
+
+def _prune():
+    """Mantém só os PROFILE_MAX_FILES perfis mais recentes (ids começam pelo timestamp)."""
+    files = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for name in files[:max(0, len(files) - PROFILE_MAX_FILES)]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except FileNotFoundError:
+            # Outro worker já removeu
+            pass
+
+def save_profile(profile: Dict[str, Any]):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = _profile_path(profile["id"])
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(profile, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    _prune()
+
+# --- Middleware ---
+
+class ProfilingMiddleware:
+    """Middleware ASGI: perfila a requisição quando pedida pelo cabeçalho de admin ou sorteada."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _trigger(self, scope) -> Optional[str]:
+        if ADMIN_TOKEN:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    return "header" if _is_admin(value.decode("latin-1")) else None
+        if PROFILE_SAMPLE_RATE > 0 and scope["path"].startswith(PROFILE_SAMPLED_PATHS) \
+                and random.random() < PROFILE_SAMPLE_RATE:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        global _in_flight, _peak_in_flight
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        _in_flight += 1
+        _peak_in_flight = max(_peak_in_flight, _in_flight)
+        try:
+            await self._call(scope, receive, send)
+        finally:
+            _in_flight -= 1
+
+    async def _call(self, scope, receive, send):
+        global _peak_in_flight
+        trigger = self._trigger(scope)
+        # Um perfil por vez: se já houver outro em andamento, segue sem perfilar
+        if trigger is None or not _active_lock.acquire(blocking=False):
+            return await self.app(scope, receive, send)
+
+        profile_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(PROFILE_ID_HEADER, profile_id.encode("latin-1"))]
+            await send(message)
+
+        spans: List[tuple] = []
+        token = metrics.span_recorder.set(spans)
+        sampler = StackSampler(
+            threading.get_ident(), PROFILE_INTERVAL_MS / 1000, asyncio.get_running_loop(), asyncio.current_task()
+        )
+        started_at = datetime.now().isoformat(timespec="milliseconds")
+        start = time.perf_counter()
+        _peak_in_flight = _in_flight
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end = time.perf_counter()
+            stacks = sampler.stop()
+            concurrent = _peak_in_flight - 1
+            metrics.span_recorder.reset(token)
+            _active_lock.release()
+
+            route = scope.get("route")
+            profile = {
+                "id": profile_id,
+                "trigger": trigger,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", "unmatched"),
+                "status": status["code"],
+                "startedAt": started_at,
+                "durationMs": round((end - start) * 1000, 3),
+                "intervalMs": PROFILE_INTERVAL_MS,
+                "spans": [
+                    {
+                        "stage": stage,
+                        "startMs": round((span_start - start) * 1000, 3),
+                        "durationMs": round((span_end - span_start) * 1000, 3),
+                        "error": error,
+                    }
+                    for stage, span_start, span_end, error in spans
+                ],
+                "samples": sum(stacks.values()),
+                # Tempo do event loop gasto com outras requisições ou ocioso durante o perfil
+                "otherTaskSamples": sampler.other_task_samples,
+                "idleSamples": sampler.idle_samples,
+                "concurrentRequests": concurrent,
+                "stacks": [f"{stack} {count}" for stack, count in stacks.most_common()],
+            }
+            try:
+                save_profile(profile)
+                print(f"🔬 [PROFILE] {profile['method']} {profile['path']} ({trigger}) -> "
+                      f"{profile['durationMs']} ms, {len(spans)} spans, {profile['samples']} amostras: {profile_id}")
+            except OSError as e:
+                print(f"⚠️ [PROFILE] Falha ao salvar perfil: {e}")
+
+# --- Rotas (Admin) ---
+
+def _require_admin(token: Optional[str]):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not _is_admin(token):
+        raise HTTPException(status_code=403, detail="Token de admin inválido")
+
+@router.get("")
+async def list_profiles(x_cronos_admin_token: Optional[str] = Header(None)):
+    _require_admin(x_cronos_admin_token)
+    if not os.path.isdir(PROFILE_DIR):
+        return {"profiles": []}
+
+    profiles = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        profiles.append({
+            key: data.get(key)
+            for key in ("id", "trigger", "method", "path", "route", "status", "startedAt", "durationMs",
+                        "samples", "otherTaskSamples", "concurrentRequests")
+        })
+    return {"profiles": profiles}
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str, x_cronos_admin_token: Optional[str] = Header(None)):
+    _require_admin(x_cronos_admin_token)
+    # O id vira nome de arquivo: nada de caminhos
+    if os.path.basename(profile_id) != profile_id or profile_id.startswith("."):
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    try:
+        with open(_profile_path(profile_id)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
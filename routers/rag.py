@@ -1,12 +1,18 @@
+import os
+import re
+import json
 import uuid
 import chromadb
 import torch
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Literal, Tuple
+from routers import metrics, lexical
+from embedding_server import remote_encoder_from_env
 
 # [2025-08-01] Sempre coloque os imports no topo do script.
 from sentence_transformers import SentenceTransformer
+from transformers import AutoTokenizer
 
 # Alterado para atender o path /query/vector do frontend
 router = APIRouter(prefix="/query", tags=["rag"])
@@ -14,11 +20,36 @@ router = APIRouter(prefix="/query", tags=["rag"])
 # --- Configurações ---
 MODEL_NAME = "intfloat/multilingual-e5-large"
 CHROMA_PATH = "./chroma_db"
+COLLECTION_NAME = "cronos_memory"
+# Ponteiro para a coleção ativa (gravado pelo reindex.py ao trocar de modelo/layout).
+# Sem o arquivo, valem COLLECTION_NAME e MODEL_NAME.
+ACTIVE_INDEX_PATH = os.getenv("ACTIVE_INDEX_PATH", "./active_index.json")
+# Com vários workers, o Chroma deve rodar como servidor (PersistentClient não é multi-processo)
+CHROMA_HOST = os.getenv("CHROMA_HOST")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8001"))
+
+# Busca híbrida (BM25 + vetor) fundida por Reciprocal Rank Fusion
+RRF_K = 60
+# Os hits são chunks: busca n_results * fator candidatos e dobra (até QUERY_MAX_CANDIDATES)
+# enquanto não houver n_results turnos distintos, para um turno longo não esgotar o orçamento.
+CANDIDATES_FACTOR = 2
+MAX_CANDIDATES = int(os.getenv("QUERY_MAX_CANDIDATES", "200"))
+MAX_CHUNKS_PER_TURN = int(os.getenv("QUERY_MAX_CHUNKS_PER_TURN", "2"))  # Melhores chunks devolvidos por turno
+
+# Chunking: o e5 trunca em 512 tokens (incluindo 'passage: ' e tokens especiais)
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "480"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "64"))
+WORDS_PER_TOKEN = 0.75  # Aproximação usada quando não há tokenizer disponível
+CHUNK_ID_SEP = "#"  # id do chunk = <id da memória>#<índice>
+
+_WORD_RE = re.compile(r"\S+")
 
 # --- Globais ---
 embedding_model = None
+tokenizer = None
 chroma_client = None
 collection = None
+_pointer_mtime = None  # mtime do active_index.json visto por último
 
 # --- Models ---
 class VectorQuery(BaseModel):
@@ -26,26 +57,76 @@ class VectorQuery(BaseModel):
     universeId: str
     userId: str
     n_results: int = 5
+    mode: Literal["vector", "hybrid"] = "vector"
 
 # --- Inicialização ---
+def active_index() -> Dict[str, str]:
+    """Coleção e modelo ativos: {"collection": ..., "model": ...}."""
+    try:
+        with open(ACTIVE_INDEX_PATH) as f:
+            pointer = json.load(f)
+        return {"collection": pointer["collection"], "model": pointer["model"]}
+    except FileNotFoundError:
+        return {"collection": COLLECTION_NAME, "model": MODEL_NAME}
+
+def _warn_if_index_swapped():
+    """
+    O reindex.py pode trocar o ponteiro com o servidor no ar. Este processo continua
+    gravando na coleção carregada no startup (o reindex.py --catch-up copia essas
+    memórias depois do restart), mas avisa no log para o restart não ser esquecido.
+    """
+    global _pointer_mtime
+    try:
+        mtime = os.stat(ACTIVE_INDEX_PATH).st_mtime
+    except FileNotFoundError:
+        return
+    if mtime == _pointer_mtime:
+        return
+    _pointer_mtime = mtime
+    active = active_index()["collection"]
+    if collection is not None and active != collection.name:
+        print(f"⚠️ [RAG] Índice ativo trocado para '{active}', mas este processo ainda grava em "
+              f"'{collection.name}'. Reinicie o servidor e rode 'python reindex.py --catch-up'.")
+
+def create_chroma_client():
+    if CHROMA_HOST:
+        return chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
+    return chromadb.PersistentClient(path=CHROMA_PATH)
+
 def init_rag_module():
-    global embedding_model, chroma_client, collection
+    global embedding_model, tokenizer, chroma_client, collection
     print("🧠 [RAG] Inicializando módulo de memória...")
     
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    print(f"🔧 [RAG] Hardware: {device.upper()}")
+    index = active_index()
+    print(f"🔧 [RAG] Índice ativo: '{index['collection']}' ({index['model']})")
     
-    try:
-        embedding_model = SentenceTransformer(MODEL_NAME, device=device)
-        print("✅ [RAG] Modelo carregado.")
-    except Exception as e:
-        print(f"❌ [RAG] Falha ao carregar modelo: {e}")
-        # Em produção, não quebre se não tiver GPU, use um modelo menor ou CPU
-        raise e
+    # Modo multi-worker: o modelo vive no servidor de embeddings compartilhado
+    embedding_model = remote_encoder_from_env()
+    if embedding_model:
+        print(f"🔧 [RAG] Usando servidor de embeddings compartilhado ({embedding_model.socket_path}).")
+    else:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        print(f"🔧 [RAG] Hardware: {device.upper()}")
+        
+        try:
+            embedding_model = SentenceTransformer(index["model"], device=device)
+            print("✅ [RAG] Modelo carregado.")
+        except Exception as e:
+            print(f"❌ [RAG] Falha ao carregar modelo: {e}")
+            # Em produção, não quebre se não tiver GPU, use um modelo menor ou CPU
+            raise e
+
+    # Tokenizer para o chunking (no modo multi-worker só o tokenizer é carregado, sem pesos)
+    tokenizer = getattr(embedding_model, "tokenizer", None)
+    if tokenizer is None and remote_encoder_from_env():
+        try:
+            tokenizer = AutoTokenizer.from_pretrained(index["model"])
+        except Exception as e:
+            print(f"⚠️ [RAG] Tokenizer indisponível ({e}); chunking por palavras.")
 
-    chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
+    chroma_client = create_chroma_client()
     collection = chroma_client.get_or_create_collection(
-        name="cronos_memory", 
+        name=index["collection"], 
         metadata={"hnsw:space": "cosine"}
     )
     print("✅ [RAG] Banco Vetorial pronto.")
@@ -55,45 +136,193 @@ def init_rag_module():
 async def internal_ingest_text(text: str, metadata: Dict[str, Any]):
     if not collection:
         raise Exception("ChromaDB não inicializado.")
+    _warn_if_index_swapped()
         
     doc_id = str(uuid.uuid4())
-    # O modelo e5 exige prefixo 'passage:' para documentos
-    emb = embedding_model.encode(f"passage: {text}").tolist()
+    with metrics.track("tokenizer.chunk"):
+        spans = chunk_spans(text)
+    chunks = [text[start:end] for start, end in spans]
+    chunk_ids = [f"{doc_id}{CHUNK_ID_SEP}{i}" for i in range(len(chunks))]
+
+    # O modelo e5 exige prefixo 'passage:' para documentos. Todos os chunks num só encode.
+    with metrics.track("model.encode_passage"):
+        embs = embedding_model.encode(
+            [f"passage: {chunk}" for chunk in chunks], batch_size=len(chunks)
+        ).tolist()
     
-    collection.add(
-        ids=[doc_id],
-        embeddings=[emb],
-        documents=[text],
-        metadatas=[metadata]
-    )
-    print(f"🧠 [RAG] Memória salva: {text[:40]}...")
+    with metrics.track("chroma.add"):
+        collection.add(
+            ids=chunk_ids,
+            embeddings=embs,
+            documents=chunks,
+            metadatas=[
+                {**metadata, "parentId": doc_id, "chunkIndex": i, "chunkCount": len(chunks),
+                 "chunkStart": start, "chunkEnd": end}
+                for i, (start, end) in enumerate(spans)
+            ]
+        )
+
+    # Índice léxico é auxiliar: uma falha aqui não invalida a memória já salva no Chroma
+    try:
+        lexical.index_documents(list(zip(chunk_ids, chunks)), metadata["userId"], metadata["universeId"])
+    except Exception as e:
+        print(f"⚠️ [RAG] Falha ao indexar no FTS5: {e}")
+    print(f"🧠 [RAG] Memória salva ({len(chunks)} chunk(s)): {text[:40]}...")
+
+# --- Chunking ---
+
+def _windows(spans: List[tuple], max_len: int, overlap: int) -> List[tuple]:
+    """Janelas deslizantes (início, fim em caracteres) sobre spans de tokens/palavras."""
+    if len(spans) <= max_len:
+        return [(spans[0][0], spans[-1][1])] if spans else []
+    step = max(1, max_len - overlap)
+    windows = []
+    for start in range(0, len(spans), step):
+        window = spans[start:start + max_len]
+        windows.append((window[0][0], window[-1][1]))
+        if start + max_len >= len(spans):
+            break
+    return windows
+
+def chunk_spans(text: str) -> List[Tuple[int, int]]:
+    """Posições (início, fim) dos chunks de até CHUNK_MAX_TOKENS, com sobreposição, em 'text'."""
+    spans = None
+    max_len, overlap = CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS
+    if tokenizer is not None:
+        try:
+            encoded = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+            spans = [span for span in encoded["offset_mapping"] if span[1] > span[0]]
+        except Exception:
+            # Tokenizers "lentos" não expõem offsets
+            spans = None
+    if spans is None:
+        spans = [m.span() for m in _WORD_RE.finditer(text)]
+        max_len = max(1, int(CHUNK_MAX_TOKENS * WORDS_PER_TOKEN))
+        overlap = int(CHUNK_OVERLAP_TOKENS * WORDS_PER_TOKEN)
+
+    windows = _windows(spans, max_len, overlap)
+    if len(windows) <= 1:
+        return [(0, len(text))]
+    return windows
+
+def chunk_text(text: str) -> List[str]:
+    """Divide passagens longas em chunks de até CHUNK_MAX_TOKENS com sobreposição."""
+    return [text[start:end] for start, end in chunk_spans(text)]
+
+def _join_chunks(chunks: List[Tuple[int, str, Dict[str, Any]]]) -> str:
+    """
+    Junta chunks de um turno em ordem de leitura. Chunks vizinhos com posições
+    conhecidas (chunkStart/chunkEnd) são emendados sem repetir a sobreposição;
+    os demais são separados por ' […] '.
+    """
+    text, prev_meta = "", None
+    for _, document, meta in sorted(chunks, key=lambda chunk: chunk[0]):
+        if prev_meta is None:
+            text = document
+        elif "chunkStart" in meta and "chunkEnd" in prev_meta and meta["chunkStart"] <= prev_meta["chunkEnd"]:
+            text += document[prev_meta["chunkEnd"] - meta["chunkStart"]:]
+        else:
+            text += " […] " + document
+        prev_meta = meta
+    return text
+
+def _merge_by_turn(hits: List[Dict[str, Any]], limit: int) -> List[str]:
+    """
+    Agrupa chunks pelo id da memória de origem (um turno ingerido), na ordem do
+    primeiro hit de cada turno, mantendo os MAX_CHUNKS_PER_TURN melhores de cada um.
+    Memórias anteriores ao chunking (id sem '#') contam como um chunk único.
+    """
+    turns: Dict[str, List[Tuple[int, str, Dict[str, Any]]]] = {}
+    for hit in hits:
+        parent, _, index = hit["id"].partition(CHUNK_ID_SEP)
+        if parent not in turns:
+            if len(turns) >= limit:
+                continue
+            turns[parent] = []
+        if len(turns[parent]) < MAX_CHUNKS_PER_TURN:
+            turns[parent].append((int(index or 0), hit["document"], hit.get("metadata") or {}))
+    return [_join_chunks(chunks) for chunks in turns.values()]
+
+def _reciprocal_rank_fusion(rankings: List[List[Dict[str, Any]]], limit: int) -> List[Dict[str, Any]]:
+    """Funde rankings [{id, document}] pela soma de 1 / (RRF_K + posição)."""
+    scores: Dict[str, float] = {}
+    first_hits: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for position, hit in enumerate(ranking, start=1):
+            scores[hit["id"]] = scores.get(hit["id"], 0.0) + 1.0 / (RRF_K + position)
+            # O primeiro ranking (vetorial) traz os metadados do chunk
+            first_hits.setdefault(hit["id"], hit)
+    best = sorted(scores, key=scores.get, reverse=True)[:limit]
+    return [
+        {"id": doc_id, "document": first_hits[doc_id]["document"], "metadata": first_hits[doc_id].get("metadata")}
+        for doc_id in best
+    ]
+
+# --- Funções Internas (Consulta: rotas HTTP e canal de sessão) ---
+
+def encode_query(text: str) -> List[float]:
+    # O modelo e5 exige prefixo 'query:' para buscas
+    with metrics.track("model.encode_query"):
+        return embedding_model.encode(f"query: {text}").tolist()
+
+async def internal_query_vector(
+    query: str, user_id: str, universe_id: str, n_results: int = 5, mode: str = "vector", emb: List[float] = None
+) -> List[str]:
+    """Busca de memórias do usuário/universo. 'emb' permite reaproveitar um embedding já calculado."""
+    if emb is None:
+        emb = encode_query(query)
+    
+    # Filtro de metadados: Apenas memórias deste Usuário E deste Universo
+    where_filter = {
+        "$and": [
+            {"userId": user_id},
+            {"universeId": universe_id}
+        ]
+    }
+    
+    hybrid = mode == "hybrid"
+    candidates = n_results * CANDIDATES_FACTOR
+    while True:
+        with metrics.track("chroma.query"):
+            res = collection.query(
+                query_embeddings=[emb], 
+                n_results=candidates,
+                where=where_filter,
+                include=["documents", "metadatas"]
+            )
+        
+        ids = res['ids'][0] if res['ids'] else []
+        hits = [
+            {"id": i, "document": d, "metadata": m}
+            for i, d, m in zip(ids, res['documents'][0], res['metadatas'][0])
+        ] if ids else []
+        exhausted = len(hits) < candidates
+        if hybrid:
+            # Índice léxico é auxiliar: se falhar, a busca segue só com o vetorial
+            try:
+                lexical_hits = lexical.search(query, user_id, universe_id, candidates)
+            except Exception as e:
+                print(f"⚠️ [RAG] Falha na busca FTS5, usando só o vetorial: {e}")
+                lexical_hits = []
+                hybrid = False
+            exhausted = exhausted and len(lexical_hits) < candidates
+            hits = _reciprocal_rank_fusion([hits, lexical_hits], len(hits) + len(lexical_hits))
+        # Chunks do mesmo turno voltam como um único documento
+        docs = _merge_by_turn(hits, n_results)
+        if len(docs) >= n_results or exhausted or candidates >= MAX_CANDIDATES:
+            break
+        candidates = min(candidates * 2, MAX_CANDIDATES)
+    print(f"🔍 [RAG] Busca '{query}' (U:{universe_id}, {mode}) -> {len(docs)} res.")
+    return docs
 
 # --- Rotas Públicas ---
 
 @router.post("/vector")
 async def query_vector(req: VectorQuery):
     try:
-        # O modelo e5 exige prefixo 'query:' para buscas
-        emb = embedding_model.encode(f"query: {req.query}").tolist()
-        
-        # Filtro de metadados: Apenas memórias deste Usuário E deste Universo
-        where_filter = {
-            "$and": [
-                {"userId": req.userId},
-                {"universeId": req.universeId}
-            ]
-        }
-        
-        res = collection.query(
-            query_embeddings=[emb], 
-            n_results=req.n_results,
-            where=where_filter
-        )
-        
-        docs = res['documents'][0] if res['documents'] else []
-        print(f"🔍 [RAG] Busca '{req.query}' (U:{req.universeId}) -> {len(docs)} res.")
+        docs = await internal_query_vector(req.query, req.userId, req.universeId, req.n_results, req.mode)
         return {"documents": docs}
     except Exception as e:
         print(f"❌ [RAG] Erro na busca: {e}")
         # Retorna lista vazia para não quebrar o jogo
-        return {"documents": []}
\ No newline at end of file
+        return {"documents": []}
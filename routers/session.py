@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, ValidationError
+from typing import Dict, Any, List, Literal, Optional
+from routers import rag, graph, ingest, metrics, admission
+
+# [2025-08-01] Sempre coloque os imports no topo do script.
+
+router = APIRouter(prefix="/session", tags=["session"])
+
+# --- Canal de Sessão (WebSocket) ---
+# Uma conexão persistente por aventura (userId + universeId fixos na URL) que
+# substitui os POSTs de cada turno (/ingest/unified, /query/vector, /query/graph).
+#
+# Mensagens do cliente:  {"id": "r1", "type": "<tipo>", "payload": {...}}
+#   ingest        -> payload do /ingest/unified sem userId/universeId
+#   query.vector  -> {"query", "n_results"?, "mode"?}
+#   query.graph   -> {"entity"}
+#   turn          -> {"ingest"?, "vector"?, "graph"?: [entidades]}: tudo do turno numa mensagem
+#   ping
+# Respostas do servidor: {"id": "r1", "type": "<tipo>.result", ...}, exceto o
+# ingest, que é confirmado por um "ingest.ack" empurrado quando termina (o cliente
+# não precisa esperar para mandar as consultas). Erros: {"id", "type": "error", "error"}.
+# O turn.result sempre traz o resultado do ingest; consultas que falharem vão em
+# "errors" (por seção), sem descartar o que deu certo.
+#
+# Cada mensagem roda numa task própria; ingests da mesma sessão são serializados
+# para o log de turnos (deltas) manter a ordem de chegada.
+
+MAX_IN_FLIGHT = int(os.getenv("SESSION_MAX_IN_FLIGHT", "16"))
+EMBEDDING_CACHE_SIZE = int(os.getenv("SESSION_EMBEDDING_CACHE", "256"))
+
+# Tipo da mensagem -> classe de admissão (mesmos limites das rotas HTTP)
+MESSAGE_CLASSES = {
+    "ingest": "ingest",
+    "query.vector": "vector",
+    "query.graph": "graph",
+}
+
+KNOWN_TYPES = ("ingest", "query.vector", "query.graph", "turn", "ping")
+
+# --- Models ---
+
+class SessionVectorQuery(BaseModel):
+    query: str
+    n_results: int = 5
+    mode: Literal["vector", "hybrid"] = "vector"
+
+class SessionGraphQuery(BaseModel):
+    entity: str
+
+class SessionTurn(BaseModel):
+    ingest: Optional[Dict[str, Any]] = None
+    vector: Optional[SessionVectorQuery] = None
+    graph: List[str] = []
+
+# --- Helpers ---
+
+class _LRU:
+    def __init__(self, size: int):
+        self.size = size
+        self._items: "OrderedDict[Any, Any]" = OrderedDict()
+
+    def get(self, key):
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if self.size <= 0:
+            return
+        self._items[key] = value
+        self._items.move_to_end(key)
+        if len(self._items) > self.size:
+            self._items.popitem(last=False)
+
+class SessionBusy(Exception):
+    def __init__(self, route_class: str):
+        super().__init__(f"Servidor ocupado ({route_class}). Tente novamente em {admission.RETRY_AFTER_S}s.")
+
+def _error_info(e: Exception) -> Dict[str, Any]:
+    if isinstance(e, SessionBusy):
+        return {"error": str(e), "retryAfter": admission.RETRY_AFTER_S}
+    if isinstance(e, ValidationError):
+        return {"error": f"Payload inválido: {e.errors()}"}
+    return {"error": str(e)}
+
+@asynccontextmanager
+async def _admitted(route_class: str):
+    """Mesmo controle de admissão do AdmissionMiddleware, aplicado por mensagem."""
+    limiter = admission.limiters.get(route_class)
+    if limiter is None:
+        yield
+        return
+    if not await limiter.acquire():
+        raise SessionBusy(route_class)
+    try:
+        yield
+    finally:
+        limiter.release()
+
+# --- Sessão ---
+
+class AdventureSession:
+    def __init__(self, websocket: WebSocket, user_id: str, universe_id: str):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.universe_id = universe_id
+        # Cache quente: o embedding de uma consulta não depende dos dados, então
+        # sobrevive aos ingests. Resultados (memórias, vizinhança do grafo) não são
+        # guardados: HTTP, /library e outras sessões também gravam na mesma aventura.
+        self.embeddings = _LRU(EMBEDDING_CACHE_SIZE)
+        self.tasks: Dict[asyncio.Task, str] = {}
+        self._send_lock = asyncio.Lock()
+        self._ingest_lock = asyncio.Lock()
+
+    async def send(self, message: Dict[str, Any]):
+        # Várias tasks respondem pela mesma conexão: um envio por vez
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    async def run(self):
+        await self.send({"type": "session.ready", "userId": self.user_id, "universeId": self.universe_id})
+        while True:
+            raw = await self.websocket.receive_text()
+            try:
+                message = json.loads(raw)
+                request_id, kind = message.get("id"), message["type"]
+            except (ValueError, KeyError, AttributeError):
+                await self.send({"id": None, "type": "error", "error": "Mensagem inválida: esperado JSON com 'type'."})
+                continue
+
+            if len(self.tasks) >= MAX_IN_FLIGHT:
+                await self.send({"id": request_id, "type": "error", "error": "Muitas mensagens em andamento nesta sessão.",
+                                 "retryAfter": admission.RETRY_AFTER_S})
+                continue
+
+            task = asyncio.create_task(self.handle(request_id, kind, message.get("payload") or {}))
+            self.tasks[task] = kind
+            task.add_done_callback(self.tasks.pop)
+
+    async def close(self):
+        """Cancela consultas pendentes, mas deixa os ingests terminarem (o turno não se perde)."""
+        pending_ingests = []
+        for task, kind in list(self.tasks.items()):
+            if kind in ("ingest", "turn"):
+                pending_ingests.append(task)
+            else:
+                task.cancel()
+        if pending_ingests:
+            await asyncio.gather(*pending_ingests, return_exceptions=True)
+
+    async def handle(self, request_id, kind: str, payload: Dict[str, Any]):
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            if kind == "ingest":
+                result = await self.ingest(payload)
+                reply = {"id": request_id, "type": "ingest.ack", **result}
+            elif kind == "query.vector":
+                reply = {"id": request_id, "type": "query.vector.result",
+                         "documents": await self.query_vector(SessionVectorQuery(**payload))}
+            elif kind == "query.graph":
+                query = SessionGraphQuery(**payload)
+                reply = {"id": request_id, "type": "query.graph.result", "edges": await self.query_graph(query.entity)}
+            elif kind == "turn":
+                reply = {"id": request_id, "type": "turn.result", **await self.turn(SessionTurn(**payload))}
+                if "errors" in reply or reply.get("ingest", {}).get("status") == "error":
+                    status = "partial"
+            elif kind == "ping":
+                reply = {"id": request_id, "type": "pong"}
+            else:
+                status = "error"
+                reply = {"id": request_id, "type": "error", "error": f"Tipo de mensagem desconhecido: '{kind}'."}
+        except (ValidationError, SessionBusy) as e:
+            status = "busy" if isinstance(e, SessionBusy) else "error"
+            reply = {"id": request_id, "type": "error", **_error_info(e)}
+        except Exception as e:
+            status = "error"
+            print(f"❌ [SESSION] Erro em '{kind}' ({self.user_id}/{self.universe_id}): {e}")
+            reply = {"id": request_id, "type": "error", **_error_info(e)}
+        finally:
+            # Tipos desconhecidos vão para um rótulo só, para não explodir a cardinalidade
+            label = kind if kind in KNOWN_TYPES else "unknown"
+            metrics.observe(metrics.ROUTE_METRIC, time.perf_counter() - start, route=f"ws:{label}", method="WS", status=status)
+
+        try:
+            await self.send(reply)
+        except (WebSocketDisconnect, RuntimeError):
+            # Cliente já desconectou (ex.: ack de um ingest concluído após o close)
+            pass
+
+    # --- Operações ---
+
+    async def ingest(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        unified = ingest.UnifiedIngestPayload(**{**payload, "userId": self.user_id, "universeId": self.universe_id})
+        async with self._ingest_lock, _admitted(MESSAGE_CLASSES["ingest"]):
+            result = await ingest.ingest_unified(unified)
+        return {"turnId": unified.turnId, **result}
+
+    async def query_vector(self, query: SessionVectorQuery) -> List[str]:
+        async with _admitted(MESSAGE_CLASSES["query.vector"]):
+            emb = self.embeddings.get(query.query)
+            if emb is None:
+                emb = rag.encode_query(query.query)
+                self.embeddings.put(query.query, emb)
+            return await rag.internal_query_vector(
+                query.query, self.user_id, self.universe_id, query.n_results, query.mode, emb=emb
+            )
+
+    async def query_graph(self, entity: str) -> List[Dict[str, Any]]:
+        async with _admitted(MESSAGE_CLASSES["query.graph"]):
+            return await graph.internal_query_graph(entity, self.universe_id, self.user_id)
+
+    async def turn(self, turn: SessionTurn) -> Dict[str, Any]:
+        """
+        Ingest do turno anterior + contexto do próximo. As consultas rodam depois do
+        ingest para já enxergá-lo. Cada seção falha sozinha: o resultado do ingest
+        sempre volta, com status "error" se falhou (um cliente que repetisse o turno
+        inteiro duplicaria a memória e o delta), e as falhas das consultas vão em "errors".
+        """
+        result: Dict[str, Any] = {}
+        errors: Dict[str, Any] = {}
+        if turn.ingest is not None:
+            try:
+                result["ingest"] = await self.ingest(turn.ingest)
+            except Exception as e:
+                print(f"❌ [SESSION] Erro no ingest do turno ({self.user_id}/{self.universe_id}): {e}")
+                result["ingest"] = {"turnId": turn.ingest.get("turnId"), "status": "error", **_error_info(e)}
+
+        if turn.vector is not None:
+            try:
+                result["documents"] = await self.query_vector(turn.vector)
+            except Exception as e:
+                errors["vector"] = _error_info(e)
+
+        if turn.graph:
+            result["edges"] = {}
+            for entity in turn.graph:
+                try:
+                    result["edges"][entity] = await self.query_graph(entity)
+                except Exception as e:
+                    errors.setdefault("graph", {})[entity] = _error_info(e)
+
+        if errors:
+            result["errors"] = errors
+        return result
+
+# --- Rota ---
+
+@router.websocket("/ws/{user_id}/{universe_id}")
+async def session_channel(websocket: WebSocket, user_id: str, universe_id: str):
+    await websocket.accept()
+    session = AdventureSession(websocket, user_id, universe_id)
+    print(f"🔌 [SESSION] Sessão aberta: {user_id} / {universe_id}")
+    try:
+        await session.run()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
+        print(f"🔌 [SESSION] Sessão encerrada: {user_id} / {universe_id}")
@@ -1,8 +1,12 @@
+import os
+import copy
 import sqlite3
 import json
+import zlib
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+from routers import metrics
 
 # [2025-08-01] Sempre coloque os imports no topo do script.
 
@@ -10,12 +14,30 @@ router = APIRouter(prefix="/state", tags=["state"])
 
 SQLITE_PATH = "./world_state.db"
 
+# --- Configuração do Log de Turnos ---
+# A cada N turnos gravamos um snapshot completo; entre eles, apenas o diff JSON.
+# Isso limita a reconstrução de qualquer turno a no máximo N-1 deltas.
+SNAPSHOT_INTERVAL = max(1, int(os.getenv("TURN_LOG_SNAPSHOT_INTERVAL", "20")))
+COMPRESS_LOGS = os.getenv("TURN_LOG_COMPRESS", "1") == "1"
+COMPRESS_MIN_BYTES = 256  # Payloads menores não compensam o cabeçalho do zlib
+
+# Tabelas mantidas pelo ingest; não podem ser escritas pelas rotas genéricas
+INTERNAL_TABLES = {"turn_logs", "adventure_state"}
+
+# --- Globais ---
+# Cache do schema: tabela -> {"columns": set, "pk": tuple}
+schema_cache: Dict[str, Dict[str, Any]] = {}
+
 # --- Models ---
 class StateUpdate(BaseModel):
     table: str
     data: Dict[str, Any]
     condition_id: str
 
+class BulkStateUpdate(BaseModel):
+    table: str
+    rows: List[Dict[str, Any]]
+
 # --- Inicialização ---
 def init_state_module():
     print("📊 [STATE] Verificando banco de dados SQLite...")
@@ -45,28 +67,279 @@ def init_state_module():
         )
     ''')
     
+    # Colunas do formato delta (bancos antigos só têm data_json)
+    # kind: 'snapshot' | 'delta' (NULL = linha legada com JSON completo em data_json)
+    # codec: 'json' | 'zlib'
+    existing_cols = {row[1] for row in cursor.execute("PRAGMA table_info(turn_logs)")}
+    for col, col_type in (("kind", "TEXT"), ("codec", "TEXT"), ("payload", "BLOB")):
+        if col not in existing_cols:
+            cursor.execute(f"ALTER TABLE turn_logs ADD COLUMN {col} {col_type}")
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_turn_logs_adventure
+        ON turn_logs (user_id, universe_id, id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_turn_logs_turn
+        ON turn_logs (user_id, universe_id, turn_id)
+    ''')
+
+    # Estado atual por aventura (materializado pelo ingest, leitura O(1) por PK)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS adventure_state (
+            user_id TEXT,
+            universe_id TEXT,
+            turn_id INTEGER,
+            deltas_since_snapshot INTEGER DEFAULT 0,
+            data_json TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, universe_id)
+        )
+    ''')
+
     conn.commit()
+    _refresh_schema_cache(cursor)
     conn.close()
     print("✅ [STATE] SQLite pronto.")
 
+# --- Introspecção de Schema ---
+
+def _refresh_schema_cache(cursor: sqlite3.Cursor):
+    schema_cache.clear()
+    tables = cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+    for (table,) in tables:
+        # PRAGMA table_info: (cid, name, type, notnull, default, pk)
+        info = cursor.execute(f"PRAGMA table_info({_quote(table)})").fetchall()
+        pk = tuple(col[1] for col in sorted((c for c in info if c[5]), key=lambda c: c[5]))
+        schema_cache[table] = {"columns": {col[1] for col in info}, "pk": pk}
+
+def _quote(name: str) -> str:
+    """Identificador entre aspas: colunas com nome de palavra-chave (order, group...) também valem."""
+    return '"' + name.replace('"', '""') + '"'
+
+def _validate_write(cursor: sqlite3.Cursor, table: str, columns) -> Dict[str, Any]:
+    """Garante que tabela e colunas existem no schema antes de interpolá-las no SQL."""
+    if table not in schema_cache:
+        # Tabela pode ter sido criada depois do startup
+        _refresh_schema_cache(cursor)
+    schema = schema_cache.get(table)
+    if schema is None or table in INTERNAL_TABLES:
+        raise HTTPException(400, f"Tabela inválida: {table}")
+
+    unknown = set(columns) - schema["columns"]
+    if unknown:
+        raise HTTPException(400, f"Colunas inválidas para '{table}': {sorted(unknown)}")
+    return schema
+
+# --- Codificação do Log de Turnos (Snapshots + Deltas) ---
+
+def _json_diff(old: Any, new: Any, path: Tuple = (), ops: Optional[Dict[str, List]] = None) -> Dict[str, List]:
+    """Gera um diff mínimo entre dois documentos JSON: {"set": [[path, valor]], "del": [path]}."""
+    if ops is None:
+        ops = {"set": [], "del": []}
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                ops["del"].append(list(path) + [key])
+        for key, value in new.items():
+            if key in old:
+                _json_diff(old[key], value, path + (key,), ops)
+            else:
+                ops["set"].append([list(path) + [key], value])
+    elif type(old) is not type(new) or old != new:
+        # Listas e escalares são substituídos inteiros (o inventário é curto)
+        ops["set"].append([list(path), new])
+
+    return ops
+
+def _json_patch(state: Any, ops: Dict[str, List]) -> Any:
+    """Aplica um diff gerado por _json_diff. Modifica 'state' no lugar quando possível."""
+    for path in ops.get("del", []):
+        parent = state
+        for key in path[:-1]:
+            parent = parent[key]
+        parent.pop(path[-1], None)
+
+    for path, value in ops.get("set", []):
+        if not path:
+            state = value
+            continue
+        parent = state
+        for key in path[:-1]:
+            parent = parent[key]
+        parent[path[-1]] = value
+
+    return state
+
+def _encode_payload(obj: Any) -> Tuple[str, bytes]:
+    raw = json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if COMPRESS_LOGS and len(raw) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            return "zlib", packed
+    return "json", raw
+
+def _decode_payload(codec: str, payload: bytes) -> Any:
+    if codec == "zlib":
+        payload = zlib.decompress(payload)
+    return json.loads(payload)
+
+def _apply_row(current: Any, kind: Optional[str], codec: str, payload: bytes, data_json: str) -> Any:
+    """Avança o estado em uma linha do turn_logs."""
+    if kind is None:
+        return json.loads(data_json)
+    if kind == "snapshot":
+        return _decode_payload(codec, payload)
+    return _json_patch(current if current is not None else {}, _decode_payload(codec, payload))
+
+def _reconstruct_state(cursor: sqlite3.Cursor, user_id: str, universe_id: str, target_row_id: int) -> Tuple[Any, int]:
+    """
+    Retorna (estado, deltas_desde_o_snapshot) para a linha 'target_row_id' da aventura.
+    Lê apenas o último snapshot anterior ao alvo e os deltas até ele.
+    """
+    cursor.execute('''
+        SELECT kind, codec, payload, data_json FROM turn_logs
+        WHERE user_id = ? AND universe_id = ? AND id <= ? AND id >= (
+            SELECT COALESCE(MAX(id), 0) FROM turn_logs
+            WHERE user_id = ? AND universe_id = ? AND id <= ?
+              AND (kind IS NULL OR kind = 'snapshot')
+        )
+        ORDER BY id
+    ''', (user_id, universe_id, target_row_id, user_id, universe_id, target_row_id))
+    rows = cursor.fetchall()
+
+    state = None
+    for row in rows:
+        state = _apply_row(state, *row)
+    return state, max(len(rows) - 1, 0)
+
+def _encode_turn(previous_state: Any, deltas_since_snapshot: int, data: Dict[str, Any]) -> Tuple[str, str, bytes]:
+    """Decide entre snapshot e delta para o próximo turno e devolve (kind, codec, payload)."""
+    if previous_state is None or deltas_since_snapshot + 1 >= SNAPSHOT_INTERVAL:
+        return ("snapshot",) + _encode_payload(data)
+    return ("delta",) + _encode_payload(_json_diff(previous_state, data))
+
+# --- Estado Atual (Materializado) ---
+
+def _save_current_state(cursor: sqlite3.Cursor, user_id: str, universe_id: str, turn_id: int, deltas: int, data: Any):
+    cursor.execute('''
+        INSERT INTO adventure_state (user_id, universe_id, turn_id, deltas_since_snapshot, data_json, updated_at)
+        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (user_id, universe_id) DO UPDATE SET
+            turn_id = excluded.turn_id,
+            deltas_since_snapshot = excluded.deltas_since_snapshot,
+            data_json = excluded.data_json,
+            updated_at = excluded.updated_at
+    ''', (user_id, universe_id, turn_id, deltas, json.dumps(data)))
+
+def _load_current_state(cursor: sqlite3.Cursor, user_id: str, universe_id: str) -> Tuple[Any, int]:
+    """
+    Retorna (estado, deltas_desde_o_snapshot) do último turno da aventura.
+    Aventuras gravadas antes da tabela adventure_state são reconstruídas uma vez
+    a partir do turn_logs e materializadas na mesma transação.
+    """
+    cursor.execute(
+        "SELECT deltas_since_snapshot, data_json FROM adventure_state WHERE user_id = ? AND universe_id = ?",
+        (user_id, universe_id)
+    )
+    row = cursor.fetchone()
+    if row:
+        return json.loads(row[1]), row[0]
+
+    cursor.execute(
+        "SELECT id, turn_id FROM turn_logs WHERE user_id = ? AND universe_id = ? ORDER BY id DESC LIMIT 1",
+        (user_id, universe_id)
+    )
+    last = cursor.fetchone()
+    if not last:
+        return None, 0
+
+    state, deltas = _reconstruct_state(cursor, user_id, universe_id, last[0])
+    _save_current_state(cursor, user_id, universe_id, last[1], deltas, state)
+    return state, deltas
+
 # --- Funções Internas ---
 
 async def internal_log_turn(user_id: str, universe_id: str, turn_id: int, data: Dict[str, Any]):
     conn = sqlite3.connect(SQLITE_PATH)
     cursor = conn.cursor()
     try:
-        cursor.execute(
-            "INSERT INTO turn_logs (user_id, universe_id, turn_id, data_json) VALUES (?, ?, ?, ?)",
-            (user_id, universe_id, turn_id, json.dumps(data))
-        )
-        conn.commit()
+        with metrics.track("sqlite.log_turn"):
+            # Trava de escrita desde a leitura do estado anterior até o commit
+            cursor.execute("BEGIN IMMEDIATE")
+            previous_state, deltas = _load_current_state(cursor, user_id, universe_id)
+
+            kind, codec, payload = _encode_turn(previous_state, deltas, data)
+            cursor.execute(
+                "INSERT INTO turn_logs (user_id, universe_id, turn_id, kind, codec, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, universe_id, turn_id, kind, codec, payload)
+            )
+            _save_current_state(cursor, user_id, universe_id, turn_id, 0 if kind == "snapshot" else deltas + 1, data)
+            conn.commit()
         print(f"📊 [STATE] Log do turno {turn_id} salvo.")
     except Exception as e:
+        conn.rollback()
         print(f"❌ [STATE] Erro ao salvar log: {e}")
         raise e
     finally:
         conn.close()
 
+async def internal_get_turn_state(user_id: str, universe_id: str, turn_id: int) -> Optional[Dict[str, Any]]:
+    """Estado completo (sqlData) do turno 'turn_id' ou do último turno registrado antes dele."""
+    conn = sqlite3.connect(SQLITE_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT id FROM turn_logs
+            WHERE user_id = ? AND universe_id = ? AND turn_id <= ?
+            ORDER BY turn_id DESC, id DESC LIMIT 1
+        ''', (user_id, universe_id, turn_id))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        with metrics.track("sqlite.turn_state"):
+            state, _ = _reconstruct_state(cursor, user_id, universe_id, row[0])
+        return state
+    finally:
+        conn.close()
+
+async def internal_get_current_state(user_id: str, universe_id: str) -> Optional[Dict[str, Any]]:
+    """Último estado (turnId + sqlData) da aventura, lido direto da tabela adventure_state."""
+    conn = sqlite3.connect(SQLITE_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT turn_id, data_json, updated_at FROM adventure_state WHERE user_id = ? AND universe_id = ?",
+            (user_id, universe_id)
+        )
+        row = cursor.fetchone()
+        if not row:
+            # Só abre transação de escrita se houver uma aventura legada para materializar
+            cursor.execute(
+                "SELECT 1 FROM turn_logs WHERE user_id = ? AND universe_id = ? LIMIT 1",
+                (user_id, universe_id)
+            )
+            if not cursor.fetchone():
+                return None
+
+            # Aventura legada ainda não materializada
+            cursor.execute("BEGIN IMMEDIATE")
+            state, _ = _load_current_state(cursor, user_id, universe_id)
+            conn.commit()
+            if state is None:
+                return None
+            cursor.execute(
+                "SELECT turn_id, data_json, updated_at FROM adventure_state WHERE user_id = ? AND universe_id = ?",
+                (user_id, universe_id)
+            )
+            row = cursor.fetchone()
+        return {"turnId": row[0], "sqlData": json.loads(row[1]), "updatedAt": row[2]}
+    finally:
+        conn.close()
+
 # --- Rotas ---
 
 @router.get("/player/{player_id}")
@@ -81,6 +354,21 @@ async def get_player_state(player_id: str):
         return dict(row)
     return {}
 
+@router.get("/current/{user_id}/{universe_id}")
+async def get_current_state(user_id: str, universe_id: str):
+    """Estado mais recente da aventura (usado para retomar o jogo)."""
+    current = await internal_get_current_state(user_id, universe_id)
+    if current is None:
+        raise HTTPException(404, "Aventura sem turnos registrados")
+    return current
+
+@router.get("/turns/{user_id}/{universe_id}/{turn_id}")
+async def get_turn_state(user_id: str, universe_id: str, turn_id: int):
+    state = await internal_get_turn_state(user_id, universe_id, turn_id)
+    if state is None:
+        raise HTTPException(404, "Turno não encontrado")
+    return {"turnId": turn_id, "sqlData": state}
+
 @router.post("/update")
 async def update_state(req: StateUpdate):
     """Upsert genérico (Atualiza se existe, insere se não)."""
@@ -88,11 +376,13 @@ async def update_state(req: StateUpdate):
     cursor = conn.cursor()
     
     try:
-        cols_set = ", ".join([f"{k} = ?" for k in req.data.keys()])
+        _validate_write(cursor, req.table, list(req.data.keys()) + ["id"])
+
+        cols_set = ", ".join([f"{_quote(k)} = ?" for k in req.data.keys()])
         values = list(req.data.values())
         values.append(req.condition_id)
         
-        sql_update = f"UPDATE {req.table} SET {cols_set} WHERE id = ?"
+        sql_update = f"UPDATE {_quote(req.table)} SET {cols_set} WHERE id = ?"
         cursor.execute(sql_update, values)
         
         if cursor.rowcount == 0:
@@ -100,18 +390,189 @@ async def update_state(req: StateUpdate):
             if 'id' not in insert_data:
                 insert_data['id'] = req.condition_id
                 
-            cols_ins = ", ".join(insert_data.keys())
+            cols_ins = ", ".join(_quote(k) for k in insert_data.keys())
             placeholders = ", ".join(["?" for _ in insert_data])
             vals_ins = list(insert_data.values())
             
-            sql_ins = f"INSERT INTO {req.table} ({cols_ins}) VALUES ({placeholders})"
+            sql_ins = f"INSERT INTO {_quote(req.table)} ({cols_ins}) VALUES ({placeholders})"
             cursor.execute(sql_ins, vals_ins)
             
         conn.commit()
         print(f"📊 [STATE] '{req.table}' atualizada para ID {req.condition_id}.")
         return {"status": "success"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ [STATE] Erro SQL: {e}")
+        raise HTTPException(500, str(e))
+    finally:
+        conn.close()
+
+@router.post("/update/bulk")
+async def bulk_update_state(req: BulkStateUpdate):
+    """
+    Upsert em lote: um INSERT ... ON CONFLICT DO UPDATE via executemany, numa única transação.
+    O alvo do conflito é a chave primária da tabela; cada linha deve conter todas as colunas da PK.
+    """
+    if not req.rows:
+        return {"status": "success", "rows": 0}
+
+    conn = sqlite3.connect(SQLITE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        all_columns = set().union(*(row.keys() for row in req.rows))
+        schema = _validate_write(cursor, req.table, all_columns)
+        pk = schema["pk"]
+        if not pk:
+            raise HTTPException(400, f"Tabela '{req.table}' não tem chave primária para upsert")
+
+        # Agrupa linhas consecutivas com o mesmo conjunto de colunas (preserva a ordem do lote):
+        # linhas parciais não sobrescrevem colunas ausentes com NULL
+        batches: List[Tuple[Tuple[str, ...], List[Tuple]]] = []
+        for row in req.rows:
+            missing_pk = [col for col in pk if col not in row]
+            if missing_pk:
+                raise HTTPException(400, f"Linha sem chave primária {missing_pk}: {row}")
+            cols = tuple(sorted(row.keys()))
+            if not batches or batches[-1][0] != cols:
+                batches.append((cols, []))
+            batches[-1][1].append(tuple(row[col] for col in cols))
+
+        conflict = ", ".join(_quote(col) for col in pk)
+        with metrics.track("sqlite.bulk_upsert"):
+            for cols, values in batches:
+                placeholders = ", ".join(["?" for _ in cols])
+                updates = ", ".join(f"{_quote(col)} = excluded.{_quote(col)}" for col in cols if col not in pk)
+                action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+                columns = ", ".join(_quote(col) for col in cols)
+                sql = f"INSERT INTO {_quote(req.table)} ({columns}) VALUES ({placeholders}) ON CONFLICT ({conflict}) {action}"
+                cursor.executemany(sql, values)
+
+            conn.commit()
+        print(f"📊 [STATE] '{req.table}': {len(req.rows)} linhas sincronizadas em lote.")
+        return {"status": "success", "rows": len(req.rows)}
+    except HTTPException:
+        conn.rollback()
+        raise
     except Exception as e:
+        conn.rollback()
         print(f"❌ [STATE] Erro SQL: {e}")
         raise HTTPException(500, str(e))
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+# --- Execução Standalone (Manutenção) ---
+
+def migrate_turn_logs():
+    """Regrava todo o turn_logs no formato snapshot + delta (idempotente) e compacta o arquivo."""
+    conn = sqlite3.connect(SQLITE_PATH)
+    cursor = conn.cursor()
+    try:
+        adventures = cursor.execute("SELECT DISTINCT user_id, universe_id FROM turn_logs").fetchall()
+        total_rows = 0
+        for user_id, universe_id in adventures:
+            rows = cursor.execute('''
+                SELECT id, turn_id, kind, codec, payload, data_json FROM turn_logs
+                WHERE user_id = ? AND universe_id = ? ORDER BY id
+            ''', (user_id, universe_id)).fetchall()
+
+            previous_state, deltas = (None, 0)
+            updates = []
+            for row_id, _, *row in rows:
+                # Copia antes de aplicar: o estado anterior ainda é a base do próximo diff
+                state = _apply_row(copy.deepcopy(previous_state), *row)
+                kind, codec, payload = _encode_turn(previous_state, deltas, state)
+                deltas = 0 if kind == "snapshot" else deltas + 1
+                updates.append((kind, codec, payload, row_id))
+                previous_state = state
+
+            cursor.executemany(
+                "UPDATE turn_logs SET kind = ?, codec = ?, payload = ?, data_json = NULL WHERE id = ?",
+                updates
+            )
+            _save_current_state(cursor, user_id, universe_id, rows[-1][1], deltas, previous_state)
+            conn.commit()
+            total_rows += len(updates)
+            print(f"📊 [STATE] Aventura {user_id}/{universe_id}: {len(updates)} turnos convertidos.")
+
+        print("📊 [STATE] Compactando arquivo (VACUUM)...")
+        conn.execute("VACUUM")
+        print(f"✅ [STATE] Migração concluída: {total_rows} turnos em {len(adventures)} aventuras.")
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ [STATE] Erro na migração: {e}")
+    finally:
+        conn.close()
+
+def turn_log_size_report() -> Dict[str, Any]:
+    """Compara o tamanho armazenado do turn_logs com o tamanho lógico (JSON completo por turno)."""
+    conn = sqlite3.connect(SQLITE_PATH)
+    cursor = conn.cursor()
+    try:
+        rows, legacy, snapshots, deltas, json_bytes, payload_bytes = cursor.execute('''
+            SELECT COUNT(*),
+                   COALESCE(SUM(kind IS NULL), 0),
+                   COALESCE(SUM(kind = 'snapshot'), 0),
+                   COALESCE(SUM(kind = 'delta'), 0),
+                   COALESCE(SUM(LENGTH(data_json)), 0),
+                   COALESCE(SUM(LENGTH(payload)), 0)
+            FROM turn_logs
+        ''').fetchone()
+
+        # Tamanho lógico: reconstrói cada aventura em sequência (uma passada por linha)
+        logical_bytes = 0
+        adventures = cursor.execute("SELECT DISTINCT user_id, universe_id FROM turn_logs").fetchall()
+        for user_id, universe_id in adventures:
+            state = None
+            for row in cursor.execute('''
+                SELECT kind, codec, payload, data_json FROM turn_logs
+                WHERE user_id = ? AND universe_id = ? ORDER BY id
+            ''', (user_id, universe_id)).fetchall():
+                state = _apply_row(state, *row)
+                logical_bytes += len(json.dumps(state).encode("utf-8"))
+
+        page_size = cursor.execute("PRAGMA page_size").fetchone()[0]
+        page_count = cursor.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        conn.close()
+
+    stored_bytes = json_bytes + payload_bytes
+    report = {
+        "rows": rows,
+        "legacyRows": legacy,
+        "snapshotRows": snapshots,
+        "deltaRows": deltas,
+        "storedBytes": stored_bytes,
+        "logicalBytes": logical_bytes,
+        "ratio": round(stored_bytes / logical_bytes, 4) if logical_bytes else None,
+        "fileBytes": page_size * page_count,
+    }
+
+    print("\n--- 📏 Relatório de Tamanho (turn_logs) ---")
+    print(f"Turnos: {rows} (legado: {legacy} | snapshots: {snapshots} | deltas: {deltas})")
+    print(f"Armazenado: {stored_bytes} bytes | Lógico: {logical_bytes} bytes | Razão: {report['ratio']}")
+    print(f"Arquivo SQLite: {report['fileBytes']} bytes")
+    return report
+
+if __name__ == "__main__":
+    # Permite rodar este arquivo diretamente para manutenção (python -m routers.state)
+    init_state_module()
+
+    while True:
+        print("\n--- 🛠️  Menu de Manutenção SQLite ---")
+        print("1. Relatório de tamanho do turn_logs")
+        print("2. Migrar turn_logs para snapshot + delta")
+        print("3. Sair")
+
+        opt = input("Escolha uma opção: ")
+        if opt == "1":
+            turn_log_size_report()
+        elif opt == "2":
+            migrate_turn_logs()
+            turn_log_size_report()
+        elif opt == "3":
+            print("Saindo...")
+            break
+        else:
+            print("Opção inválida.")
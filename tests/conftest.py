@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os módulos são importados como no main.py (from routers import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,115 @@
+import asyncio
+import copy
+import json
+import sqlite3
+
+import pytest
+
+from routers import state
+
+# Round-trip do log de turnos (snapshots + deltas): cada turno gravado precisa
+# ser reconstruído exatamente, antes e depois do migrate_turn_logs.
+
+SNAPSHOT_INTERVAL = 4
+
+def _turn_data(turn: int) -> dict:
+    data = {
+        "playerStatus": {"hp": 100 - turn, "level": 1 + turn // 5, "buffs": {"haste": turn % 3 == 0}},
+        "inventory": ["tocha"] + [f"item-{i}" for i in range(turn % 4)],
+        "worldState": {"day": turn // 3, "weather": ["sol", "chuva"][turn % 2]},
+    }
+    # Chaves que aparecem e somem exercitam o 'del' do diff
+    if turn % 2:
+        data["worldState"]["event"] = f"evento-{turn}"
+    if turn % 5 == 0:
+        data["playerStatus"] = None
+    return data
+
+def _insert_legacy(user_id: str, universe_id: str, turn_id: int, data: dict):
+    conn = sqlite3.connect(state.SQLITE_PATH)
+    with conn:
+        conn.execute(
+            "INSERT INTO turn_logs (user_id, universe_id, turn_id, data_json) VALUES (?, ?, ?, ?)",
+            (user_id, universe_id, turn_id, json.dumps(data))
+        )
+    conn.close()
+
+def _assert_all_turns(expected: dict):
+    for (user_id, universe_id), turns in expected.items():
+        for turn_id, data in turns.items():
+            assert asyncio.run(state.internal_get_turn_state(user_id, universe_id, turn_id)) == data, \
+                (user_id, universe_id, turn_id)
+
+@pytest.fixture
+def state_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(state, "SQLITE_PATH", str(tmp_path / "world_state.db"))
+    monkeypatch.setattr(state, "SNAPSHOT_INTERVAL", SNAPSHOT_INTERVAL)
+    # Payloads pequenos também passam pelo zlib
+    monkeypatch.setattr(state, "COMPRESS_MIN_BYTES", 0)
+    state.init_state_module()
+    return state.SQLITE_PATH
+
+def test_turn_log_round_trip_with_legacy_rows_and_migration(state_db):
+    legacy_prefix = ("u1", "mixed")   # linhas legadas seguidas do formato novo
+    legacy_only = ("u1", "legacy")    # só linhas legadas
+    delta_only = ("u2", "delta")      # só o formato novo
+    expected = {legacy_prefix: {}, legacy_only: {}, delta_only: {}}
+
+    # Banco antigo: data_json completo por turno, linhas de aventuras intercaladas
+    for turn in range(1, 7):
+        for adventure in (legacy_prefix, legacy_only):
+            data = _turn_data(turn)
+            _insert_legacy(*adventure, turn, data)
+            expected[adventure][turn] = copy.deepcopy(data)
+
+    # Servidor novo: várias fronteiras de snapshot, ainda intercalando aventuras
+    for turn in range(7, 7 + SNAPSHOT_INTERVAL * 3 + 1):
+        for adventure in (legacy_prefix, delta_only):
+            data = _turn_data(turn)
+            asyncio.run(state.internal_log_turn(*adventure, turn, data))
+            expected[adventure][turn] = copy.deepcopy(data)
+
+    conn = sqlite3.connect(state_db)
+    kinds = {kind for (kind,) in conn.execute("SELECT DISTINCT kind FROM turn_logs")}
+    conn.close()
+    assert kinds == {None, "snapshot", "delta"}
+
+    _assert_all_turns(expected)
+
+    state.migrate_turn_logs()
+    _assert_all_turns(expected)
+
+    conn = sqlite3.connect(state_db)
+    legacy_rows = conn.execute("SELECT COUNT(*) FROM turn_logs WHERE kind IS NULL OR data_json IS NOT NULL").fetchone()[0]
+    max_run = conn.execute("SELECT MAX(deltas_since_snapshot) FROM adventure_state").fetchone()[0]
+    conn.close()
+    assert legacy_rows == 0
+    assert max_run < SNAPSHOT_INTERVAL
+
+    # Idempotente, e o log continua consistente para turnos gravados depois da migração
+    state.migrate_turn_logs()
+    for adventure in expected:
+        turn = max(expected[adventure]) + 1
+        data = _turn_data(turn)
+        asyncio.run(state.internal_log_turn(*adventure, turn, data))
+        expected[adventure][turn] = copy.deepcopy(data)
+    _assert_all_turns(expected)
+
+    for adventure, turns in expected.items():
+        current = asyncio.run(state.internal_get_current_state(*adventure))
+        last = max(turns)
+        assert current["turnId"] == last
+        assert current["sqlData"] == turns[last]
+
+def test_current_state_miss_does_not_take_the_write_lock(state_db):
+    asyncio.run(state.internal_log_turn("u1", "w1", 1, _turn_data(1)))
+
+    # Outro processo segurando a trava de escrita (como um internal_log_turn em andamento)
+    writer = sqlite3.connect(state_db, timeout=0)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        assert asyncio.run(state.internal_get_current_state("u1", "unknown")) is None
+        assert asyncio.run(state.internal_get_current_state("u1", "w1"))["turnId"] == 1
+    finally:
+        writer.rollback()
+        writer.close()
@@ -0,0 +1,42 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from routers import state
+
+# Upserts genéricos (/state/update e /state/update/bulk): nomes de tabela e coluna
+# validados contra o schema também podem ser palavras-chave do SQL.
+
+@pytest.fixture
+def state_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(state, "SQLITE_PATH", str(tmp_path / "world_state.db"))
+    state.init_state_module()
+    conn = sqlite3.connect(state.SQLITE_PATH)
+    with conn:
+        conn.execute('CREATE TABLE "quest" (id TEXT PRIMARY KEY, "order" INTEGER, "group" TEXT)')
+        conn.execute('CREATE TABLE "select" ("group" TEXT, "order" INTEGER, "values" TEXT, PRIMARY KEY ("group", "order"))')
+    conn.close()
+
+def _rows(sql: str):
+    conn = sqlite3.connect(state.SQLITE_PATH)
+    rows = conn.execute(sql).fetchall()
+    conn.close()
+    return rows
+
+def test_update_with_keyword_columns(state_db):
+    update = state.StateUpdate(table="quest", data={"order": 1, "group": "a"}, condition_id="q1")
+    assert asyncio.run(state.update_state(update)) == {"status": "success"}
+    update = state.StateUpdate(table="quest", data={"order": 2}, condition_id="q1")
+    asyncio.run(state.update_state(update))
+    assert _rows('SELECT id, "order", "group" FROM quest') == [("q1", 2, "a")]
+
+def test_bulk_update_with_keyword_table_and_columns(state_db):
+    rows = [
+        {"group": "a", "order": 1, "values": "x"},
+        {"group": "a", "order": 2, "values": "y"},
+        {"group": "a", "order": 1, "values": "z"},
+    ]
+    result = asyncio.run(state.bulk_update_state(state.BulkStateUpdate(table="select", rows=rows)))
+    assert result == {"status": "success", "rows": 3}
+    assert _rows('SELECT "group", "order", "values" FROM "select" ORDER BY "order"') == [("a", 1, "z"), ("a", 2, "y")]